@@ -1,17 +1,23 @@
-from typing import Any
+from typing import Any, Callable
 
 from common.config import cfg
-from fastapi import Response
+from common.utils import COMPRESS_MIN_SIZE, dump_json
+from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 
 
+class JSONAnswer(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
 def HTTPanswer(
     status_code: int,
     description: Any,
     action_cookie: str | None = None,
     token: str | None = None,
 ) -> JSONResponse:
-    response = JSONResponse(
+    response = JSONAnswer(
         status_code=status_code,
         content={"content": description},
     )
@@ -33,3 +39,57 @@ def HTTPanswer(
 
 def PlainAnswer(description: str) -> Response:
     return Response(content=description, media_type="text/html")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def accepted_encoding(accept_encoding: str) -> str:
+    qualities = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        qualities[coding.strip()] = quality
+
+    best = ""
+    best_quality = 0
+    # brotli wins when qualities are equal
+    for encoding in ("br", "gzip"):
+        quality = qualities.get(encoding, qualities.get("*", 0))
+        if quality > best_quality:
+            best = encoding
+            best_quality = quality
+    return best
+
+
+def CachedAnswer(
+    request: Request,
+    tag: str,
+    content: bytes,
+    encode: Callable[[str], bytes] | None = None,
+) -> Response:
+    encoding = ""
+    headers = {"Cache-Control": "no-cache"}
+    if encode != None:
+        headers["Vary"] = "Accept-Encoding"
+        if len(content) >= COMPRESS_MIN_SIZE:
+            encoding = accepted_encoding(request.headers.get("Accept-Encoding", ""))
+    # every encoding is a separate representation with its own tag
+    headers["ETag"] = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+    if etag_matches(request.headers.get("If-None-Match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        content = encode(encoding)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -9,6 +9,7 @@ from api.routes.lore import router as lore_router
 from api.routes.marathons import router as marathons_router
 from api.routes.merch import router as merch_router
 from api.routes.roulette import router as roulette_router
+from api.routes.search import router as search_router
 from api.routes.site import router as site_router
 from api.routes.socials import router as socials_router
 from api.routes.twitchbot import router as twitchbot_router
@@ -29,6 +30,7 @@ routers.include_router(lore_router, prefix="/lore")
 routers.include_router(marathons_router, prefix="/marathons")
 routers.include_router(merch_router, prefix="/merch")
 routers.include_router(roulette_router, prefix="/roulette")
+routers.include_router(search_router, prefix="/search")
 routers.include_router(site_router, prefix="/site")
 routers.include_router(socials_router, prefix="/socials")
 routers.include_router(twitchbot_router, prefix="/twitchbot")
@@ -8,6 +8,8 @@ from api.verification import login_admin_required
 from common.all_data import all_data
 from common.config import cfg
 from common.errors import HTTPabort
+from common.jobs import jobs
+from db.common import get_pool_metrics
 from fastapi import APIRouter, Depends, Response
 from schemas import admin as schema_admin
 
@@ -20,6 +22,8 @@ async def secrets_update():
     if error:
         HTTPabort(400, error)
     no_secrets = cfg.apply_secrets(get_db=False)
+    if not no_secrets:
+        await cfg.save_secrets_cache()
     return HTTPanswer(200, {"Not updated": no_secrets})
 
 
@@ -29,6 +33,32 @@ async def secrets_creds(updated_creds: schema_admin.UpdatedCreds):
     return HTTPanswer(200, "Updated")
 
 
+@router.get("/startup", dependencies=[Depends(login_admin_required)])
+async def get_startup_report():
+    return HTTPanswer(200, all_data.startup_report)
+
+
+@router.get("/pool", dependencies=[Depends(login_admin_required)])
+async def get_pool():
+    return HTTPanswer(200, get_pool_metrics())
+
+
+@router.get("/jobs", dependencies=[Depends(login_admin_required)])
+async def get_jobs():
+    return HTTPanswer(200, jobs.get_all())
+
+
+@router.get("/jobs/{job_id}", dependencies=[Depends(login_admin_required)])
+async def get_job(job_id: str):
+    return HTTPanswer(200, jobs.get(job_id).info())
+
+
+@router.delete("/jobs/{job_id}", dependencies=[Depends(login_admin_required)])
+async def cancel_job(job_id: str):
+    jobs.cancel(job_id)
+    return HTTPanswer(200, "Cancelled")
+
+
 @router.get("/dump", dependencies=[Depends(login_admin_required)])
 async def get_dump():
     zip_buffer = BytesIO()
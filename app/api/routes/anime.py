@@ -1,8 +1,9 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
+from common.jobs import jobs
 from db.common import get_session
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from schemas import anime as schema_anime
 
 router = APIRouter()
@@ -10,8 +11,23 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_anime(raw: bool = False):
-    return HTTPanswer(200, await all_data.ANIME.get_all(raw))
+async def get_anime(
+    request: Request,
+    raw: bool = False,
+    fields: list[str] = Query([]),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+):
+    if raw:
+        return HTTPanswer(200, await all_data.ANIME.get_all(raw))
+    if fields or limit != None:
+        return HTTPanswer(200, all_data.ANIME.get_listing(fields, limit, cursor))
+    return CachedAnswer(
+        request,
+        all_data.ANIME.etag,
+        all_data.ANIME.get_payload(),
+        all_data.ANIME.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
@@ -68,8 +84,9 @@ async def anime_customers():
 
 
 @router.post("/pictures", dependencies=[Depends(login_admin_required)])
-async def update_stream_pictures(
-    elements: list[int] = [],
-    session=Depends(get_session),
-):
-    return HTTPanswer(200, await all_data.ANIME.update_pictures(session, elements))
+async def update_stream_pictures(elements: list[int] = []):
+    job = jobs.start(
+        "anime_pictures",
+        lambda job: all_data.ANIME.update_pictures(job, elements),
+    )
+    return HTTPanswer(202, {"job_id": job.id})
@@ -1,8 +1,8 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
 from db.common import get_session
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from schemas import auctions as schema_auctions
 
 router = APIRouter()
@@ -10,8 +10,15 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_auctions(raw: bool = False):
-    return HTTPanswer(200, await all_data.AUCTIONS.get_all(raw))
+async def get_auctions(request: Request, raw: bool = False):
+    if raw:
+        return HTTPanswer(200, await all_data.AUCTIONS.get_all(raw))
+    return CachedAnswer(
+        request,
+        all_data.AUCTIONS.etag,
+        all_data.AUCTIONS.get_payload(),
+        all_data.AUCTIONS.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
@@ -1,8 +1,8 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
 from db.common import get_session
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from schemas import challenges as schema_challenges
 
 router = APIRouter()
@@ -10,8 +10,17 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_challenges(raw: bool = False, types: list[str] = Query([])):
-    return HTTPanswer(200, await all_data.CHALLENGES.get_all(raw, types))
+async def get_challenges(
+    request: Request, raw: bool = False, types: list[str] = Query([])
+):
+    if raw:
+        return HTTPanswer(200, await all_data.CHALLENGES.get_all(raw, types))
+    return CachedAnswer(
+        request,
+        all_data.CHALLENGES.etag,
+        all_data.CHALLENGES.get_payload(types),
+        None if types else all_data.CHALLENGES.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
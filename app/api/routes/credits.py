@@ -1,8 +1,8 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
 from db.common import get_session
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from schemas import credits as schema_credits
 
 router = APIRouter()
@@ -10,8 +10,15 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_credits(raw: bool = False):
-    return HTTPanswer(200, await all_data.CREDITS.get_all(raw))
+async def get_credits(request: Request, raw: bool = False):
+    if raw:
+        return HTTPanswer(200, await all_data.CREDITS.get_all(raw))
+    return CachedAnswer(
+        request,
+        all_data.CREDITS.etag,
+        all_data.CREDITS.get_payload(),
+        all_data.CREDITS.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
@@ -1,8 +1,9 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
+from common.jobs import jobs
 from db.common import get_session
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from schemas import games as schema_games
 
 router = APIRouter()
@@ -10,8 +11,24 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_games(raw: bool = False, types: list[str] = Query([])):
-    return HTTPanswer(200, await all_data.GAMES.get_all(raw, types))
+async def get_games(
+    request: Request,
+    raw: bool = False,
+    types: list[str] = Query([]),
+    fields: list[str] = Query([]),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+):
+    if raw:
+        return HTTPanswer(200, await all_data.GAMES.get_all(raw, types))
+    if fields or limit != None:
+        return HTTPanswer(200, all_data.GAMES.get_listing(types, fields, limit, cursor))
+    return CachedAnswer(
+        request,
+        all_data.GAMES.etag,
+        all_data.GAMES.get_payload(types),
+        None if types else all_data.GAMES.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
@@ -56,6 +73,27 @@ async def delete_games(
     )
 
 
+@router.get("/search")
+async def search_games(
+    q: str = "",
+    genre: str | None = None,
+    status: str | None = None,
+    type: str | None = None,
+    gift_by: str | None = None,
+    order_by: str | None = None,
+    fields: list[str] = Query([]),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    tags = {
+        "genre": genre,
+        "status": status,
+        "type": type,
+        "gift_by": gift_by,
+        "order_by": order_by,
+    }
+    return HTTPanswer(200, all_data.GAMES.search(q, tags, fields, limit))
+
+
 @router.get("/genres")
 async def get_genres(genre: str = Query("")):
     return HTTPanswer(200, await all_data.GAMES.get_genres(genre))
@@ -87,8 +125,9 @@ async def games_customers():
 
 
 @router.post("/pictures", dependencies=[Depends(login_admin_required)])
-async def update_stream_pictures(
-    elements: list[int] = [],
-    session=Depends(get_session),
-):
-    return HTTPanswer(200, await all_data.GAMES.update_pictures(session, elements))
+async def update_stream_pictures(elements: list[int] = []):
+    job = jobs.start(
+        "games_pictures",
+        lambda job: all_data.GAMES.update_pictures(job, elements),
+    )
+    return HTTPanswer(202, {"job_id": job.id})
@@ -1,8 +1,8 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
 from db.common import get_session
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from schemas import marathons as schema_marathons
 
 router = APIRouter()
@@ -10,8 +10,15 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_marathons(raw: bool = False):
-    return HTTPanswer(200, await all_data.MARATHONS.get_all(raw))
+async def get_marathons(request: Request, raw: bool = False):
+    if raw:
+        return HTTPanswer(200, await all_data.MARATHONS.get_all(raw))
+    return CachedAnswer(
+        request,
+        all_data.MARATHONS.etag,
+        all_data.MARATHONS.get_payload(),
+        all_data.MARATHONS.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
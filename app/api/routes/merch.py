@@ -1,8 +1,8 @@
-from api.answers import HTTPanswer
+from api.answers import CachedAnswer, HTTPanswer
 from api.verification import login_admin_required
 from common.all_data import all_data
 from db.common import get_session
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from schemas import data_params as schema_data_params
 from schemas import merch as schema_merch
 
@@ -11,8 +11,15 @@ router = APIRouter()
 
 @router.get("")
 @router.get("/")
-async def get_merch(raw: bool = False):
-    return HTTPanswer(200, await all_data.MERCH.get_all(raw))
+async def get_merch(request: Request, raw: bool = False):
+    if raw:
+        return HTTPanswer(200, await all_data.MERCH.get_all(raw))
+    return CachedAnswer(
+        request,
+        all_data.MERCH.etag,
+        all_data.MERCH.get_payload(),
+        all_data.MERCH.get_encoded,
+    )
 
 
 @router.post("", dependencies=[Depends(login_admin_required)])
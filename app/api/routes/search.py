@@ -0,0 +1,15 @@
+from api.answers import HTTPanswer
+from common.search import site_search
+from fastapi import APIRouter, Query
+
+router = APIRouter()
+
+
+@router.get("")
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1),
+    types: list[str] = Query([]),
+    limit: int = Query(20, ge=1, le=100),
+):
+    return HTTPanswer(200, site_search.search(q, types, limit))
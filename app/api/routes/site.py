@@ -1,8 +1,6 @@
-import httpx
 from api.answers import HTTPanswer
 from api.verification import login_admin_required, token_messages_required
 from common.all_data import all_data
-from common.config import cfg
 from db.common import get_session
 from fastapi import APIRouter, Depends
 from schemas import data_params as schema_data_params
@@ -12,23 +10,15 @@ router = APIRouter()
 
 
 @router.post("/message", dependencies=[Depends(token_messages_required)])
-async def site_message(message: schema_site.Message):
+async def site_message(message: schema_site.Message, session=Depends(get_session)):
     if not all_data.DATA_PARAMS.get("SITE_MESSAGES_ENABLED"):
         return HTTPanswer(200, "DISABLED")
 
-    async with httpx.AsyncClient() as ac:
-        # json = {"content": f"{message.title or ''}\n\n{message.description}".strip()}
-        json = {
-            "embeds": [
-                {"title": message.title or "", "description": message.description}
-            ]
-        }
-        answer = await ac.post(cfg.DISCORD_HOOK_SITE_MESSAGES, json=json)
-        if answer.status_code < 200 or answer.status_code >= 300:
-            return HTTPanswer(
-                400,
-                f"Failed to send stream timecode to discord (code {answer.status_code})",
-            )
+    await all_data.DISCORD_OUTBOX.add(
+        session,
+        "site_messages",
+        {"title": message.title or "", "description": message.description},
+    )
     return HTTPanswer(200, "Sended")
 
 
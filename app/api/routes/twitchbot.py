@@ -1,11 +1,8 @@
-import random
-from datetime import datetime
-
-import httpx
 from api.answers import PlainAnswer
 from api.verification import verify_twitchbot_token
 from common.all_data import all_data
 from common.config import cfg
+from common.utils import rng
 from db.common import get_session
 from fastapi import APIRouter, Depends, Query
 
@@ -14,37 +11,30 @@ router = APIRouter()
 
 @router.get("/timecode", dependencies=[Depends(verify_twitchbot_token)])
 async def timecode(
-    title: str, uptime: str, user_name: str, game: str, description: str
+    title: str,
+    uptime: str,
+    user_name: str,
+    game: str,
+    description: str,
+    session=Depends(get_session),
 ):
-    message = all_data.DATA_PARAMS.get("TIMECODE_MESSAGE")
-    async with httpx.AsyncClient() as ac:
-        json = {
-            "embeds": [
-                {
-                    "title": title,
-                    "fields": [
-                        {"name": "Timecode", "value": uptime, "inline": True},
-                        {"name": "Sender", "value": user_name, "inline": True},
-                    ],
-                    "footer": {"text": game},
-                }
-            ]
-        }
-        for prefix in ("!тк", "!tc", "!timecode"):
-            description = description.replace(prefix, "")
-            description = description.replace(prefix.capitalize(), "")
-            description = description.replace(prefix.upper(), "")
-        description = description.lstrip(" ")
-        if description:
-            json["embeds"][0]["description"] = description
-        answer = await ac.post(cfg.DISCORD_HOOK_TIMECODE, json=json)
-        if answer.status_code < 200 or answer.status_code >= 300:
-            cfg.logger.error(answer.status_code)
-            cfg.logger.error(answer.content)
-            message = (
-                f"Failed to send stream timecode to discord (code {answer.status_code})"
-            )
-    return PlainAnswer(message)
+    embed = {
+        "title": title,
+        "fields": [
+            {"name": "Timecode", "value": uptime, "inline": True},
+            {"name": "Sender", "value": user_name, "inline": True},
+        ],
+        "footer": {"text": game},
+    }
+    for prefix in ("!тк", "!tc", "!timecode"):
+        description = description.replace(prefix, "")
+        description = description.replace(prefix.capitalize(), "")
+        description = description.replace(prefix.upper(), "")
+    description = description.lstrip(" ")
+    if description:
+        embed["description"] = description
+    await all_data.DISCORD_OUTBOX.add(session, "timecode", embed)
+    return PlainAnswer(all_data.DATA_PARAMS.get("TIMECODE_MESSAGE"))
 
 
 @router.get("/save_please", dependencies=[Depends(verify_twitchbot_token)])
@@ -61,22 +51,20 @@ async def bite_someone(sender: str, targets: list[str] = Query([])):
     target = cfg.STREAMER
     for variant in targets:
         if (
-            not all_data.BITE_IGNORE_LIST.has(variant.lower().rstrip().lstrip())
+            not all_data.BITE_IGNORE_LIST.has(variant)
             and variant.lower() != sender.lower()
         ):
             target = variant
             break
 
-    random.seed(datetime.now().timestamp())
     if sender == cfg.BEST_MODERATOR and (
-        random.randint(1, 100)
-        <= all_data.DATA_PARAMS.get("BITE_CHEAT_STREAMER_PERCENT")
+        rng.randint(1, 100) <= all_data.DATA_PARAMS.get("BITE_CHEAT_STREAMER_PERCENT")
     ):
         target = cfg.STREAMER
 
     message = f"Однажды тёмной ночью {sender} {action} в {place} к {target} и кусьнул за {body_part}"
     if target == cfg.BEST_MODERATOR and (
-        random.randint(1, 100) <= all_data.DATA_PARAMS.get("BITE_CHEAT_DEFENSE_PERCENT")
+        rng.randint(1, 100) <= all_data.DATA_PARAMS.get("BITE_CHEAT_DEFENSE_PERCENT")
     ):
         message = f"Однажды тёмной ночью {sender} {action} в {place} к {target} и в проваленной попытке укусить получил леща в ответ"
 
@@ -133,7 +121,7 @@ async def counter(
     if description:
         return PlainAnswer("Ошибка в команде/названии/правах")
 
-    result = await counter.update(session, name, True)
+    result = await counter.update(name, True)
     if result in ("Нет счётчика", "Cлишком быстрое изменение счётчика"):
         return PlainAnswer(result)
     else:
@@ -171,14 +159,12 @@ async def gcounter(
 async def eat_rabbit(
     name: str,
     message: str,
-    session=Depends(get_session),
 ):
     rabbit_count = message.count(name)
-    random.seed(datetime.now().timestamp())
-    rabbits_saved = int((random.randint(0, 100) / 100) * rabbit_count)
+    rabbits_saved = int((rng.randint(0, 100) / 100) * rabbit_count)
     rabbits_stealed = rabbit_count - rabbits_saved
 
-    result = await all_data.COUNTER_GLOBAL.update(session, name, False, rabbits_stealed)
+    result = await all_data.COUNTER_GLOBAL.update(name, False, rabbits_stealed)
 
     if result != "Нет счётчика":
         return PlainAnswer(
@@ -194,15 +180,12 @@ async def eat_rabbit(
 @router.get("/save-rabbit", dependencies=[Depends(verify_twitchbot_token)])
 async def save_rabbit(
     name: str,
-    session=Depends(get_session),
 ):
-    random.seed(datetime.now().timestamp())
     rabbits = int(
-        (random.randint(0, 100) / 100)
-        * (await all_data.COUNTER_GLOBAL.get_value(name, 0))
+        (rng.randint(0, 100) / 100) * (await all_data.COUNTER_GLOBAL.get_value(name, 0))
     )
 
-    result = await all_data.COUNTER_GLOBAL.update(session, name, False, -rabbits)
+    result = await all_data.COUNTER_GLOBAL.update(name, False, -rabbits)
     if result != "Нет счётчика":
         return PlainAnswer(f"Кролей спасено: {rabbits}, осталось: " + result)
     else:
@@ -3,25 +3,42 @@ from contextlib import asynccontextmanager
 from api import routers
 from common.all_data import all_data
 from common.config import cfg
+from common.counters import close_counters, init_counters
 from common.errors import exception_handlers
-from db.common import _engine, check_db
+from common.http_client import close_http_client, init_http_client
+from common.jobs import jobs
+from db.common import check_db, get_engine, init_engine
+from db.notify import start_listener, stop_listener
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
 
 
 @asynccontextmanager
 async def lifespan_function(FastAPP: FastAPI):
+    init_http_client(
+        cfg.HTTP_TIMEOUT,
+        cfg.HTTP_MAX_CONNECTIONS,
+        cfg.HTTP_MAX_PER_HOST,
+        cfg.HTTP_KEEPALIVE_EXPIRY,
+    )
+    await cfg.bootstrap_secrets()
+    init_engine()
     await check_db()
+    await init_counters()
 
-    async with AsyncSession(_engine, expire_on_commit=False) as session:
-        await all_data.setup(session)
+    await all_data.setup()
+    start_listener(all_data.reload)
 
     FastAPP.include_router(routers.routers, prefix="/api")
 
     yield
 
-    await _engine.dispose()
+    await stop_listener()
+    await jobs.stop()
+    await all_data.stop()
+    await get_engine().dispose()
+    await close_counters()
+    await close_http_client()
 
 
 app = FastAPI(
@@ -1,8 +1,15 @@
+import asyncio
+import time
+from typing import Any
+
+from common.config import cfg
 from crud.anime import AnimeData
 from crud.auctions import AuctionsData
 from crud.challenges import ChallengesData
 from crud.credits import CreditsData
 from crud.data_params import DataParamsData
+from crud.discord_outbox import DiscordOutboxData
+from crud.external import external_data
 from crud.games import GamesData
 from crud.lore import LoreData
 from crud.marathons import MarathonsData
@@ -11,12 +18,17 @@ from crud.roulette import RouletteData
 from crud.socials import SocialsData
 from crud.twitchbot_counters import TwitchBotCounter
 from crud.twitchbot_lists import TwitchBotList
+from db.common import get_engine
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class AllData:
     def __init__(self) -> None:
+        self.startup_report = {}
+
         self.DATA_PARAMS = DataParamsData()
+        self.EXTERNAL = external_data
+        self.DISCORD_OUTBOX = DiscordOutboxData()
 
         self.SAVE_CHOICES = TwitchBotList("save_choices")
 
@@ -40,30 +52,87 @@ class AllData:
         self.ROULETTE = RouletteData()
         self.SOCIALS = SocialsData()
 
-    async def setup(self, session: AsyncSession) -> None:
-        await self.DATA_PARAMS.setup(session)
-
-        await self.SAVE_CHOICES.setup(session)
-
-        await self.BITE_IGNORE_LIST.setup(session)
-        await self.BITE_ACTIONS.setup(session)
-        await self.BITE_PLACES.setup(session)
-        await self.BITE_BODY_PARTS.setup(session)
-
-        await self.COUNTER.setup(session)
-        await self.COUNTER_DEATH.setup(session)
-        await self.COUNTER_GLOBAL.setup(session)
-
-        await self.ANIME.setup(session)
-        await self.AUCTIONS.setup(session)
-        await self.CHALLENGES.setup(session)
-        await self.CREDITS.setup(session)
-        await self.GAMES.setup(session)
-        await self.LORE.setup(session)
-        await self.MARATHONS.setup(session)
-        await self.MERCH.setup(session)
-        await self.ROULETTE.setup(session)
-        await self.SOCIALS.setup(session)
+        for name, domain in self.domains().items():
+            domain.name = name
+
+    def domains(self) -> dict[str, Any]:
+        return {
+            name: domain
+            for name, domain in vars(self).items()
+            if hasattr(domain, "setup")
+        }
+
+    async def setup_domain(self, name: str, domain: Any) -> dict[str, Any]:
+        started = time.perf_counter()
+        async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+            await domain.setup(session)
+        total_ms = (time.perf_counter() - started) * 1000
+        resort_ms = getattr(domain, "resort_ms", 0)
+        report = {
+            "rows": len(domain.data),
+            "load_ms": round(total_ms - resort_ms, 1),
+            "resort_ms": round(resort_ms, 1),
+        }
+        cfg.logger.info(
+            f"{name} loaded: {report['rows']} rows, "
+            f"load {report['load_ms']} ms, resort {report['resort_ms']} ms"
+        )
+        return report
+
+    async def setup(self) -> None:
+        started = time.perf_counter()
+        domains = self.domains()
+        # every domain loads on its own pooled connection
+        reports = await asyncio.gather(
+            *(self.setup_domain(name, domain) for name, domain in domains.items())
+        )
+        # after all domains, so external cache is loaded before enrich starts
+        for domain in domains.values():
+            if hasattr(domain, "enrich_missing"):
+                domain.enrich_missing()
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.startup_report = {
+            "total_ms": total_ms,
+            "domains": dict(zip(domains, reports)),
+        }
+        cfg.logger.info(f"All data was loaded to memory in {total_ms} ms")
+
+    async def stop(self) -> None:
+        await asyncio.gather(
+            *(
+                domain.stop()
+                for domain in self.domains().values()
+                if hasattr(domain, "stop")
+            )
+        )
+
+    async def reload(self, message: dict[str, Any] | None) -> None:
+        # applies changes made by other workers
+        domains = self.domains()
+        ids = None
+        if message == None:
+            targets = [
+                domain for domain in domains.values() if hasattr(domain, "reload")
+            ]
+        elif message["domain"] == "TWITCHBOT_LISTS":
+            targets = [
+                domain
+                for domain in domains.values()
+                if isinstance(domain, TwitchBotList)
+            ]
+        elif message["domain"] == "TWITCHBOT_COUNTERS":
+            targets = [
+                domain
+                for domain in domains.values()
+                if isinstance(domain, TwitchBotCounter)
+            ]
+        else:
+            targets = [domains[message["domain"]]]
+            ids = message["ids"]
+
+        for domain in targets:
+            async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+                await domain.reload(session, ids)
 
     def has_list(self, name: str) -> bool:
         return name.upper() in (
@@ -1,10 +1,14 @@
+import asyncio
+import json
+import os
+import random
 import sys
-from time import sleep
+import time
+from typing import Any
 
-import httpx
-import requests
 import yaml
 from aiofile import async_open
+from common.http_client import get_http_client
 from common.utils import (
     disable_unnecessary_loggers,
     get_args,
@@ -34,21 +38,37 @@ class ConfigManager:
             sys.exit(1)
         self.logger.info("Creds from config were loaded")
 
-        error = self.load_secrets_sync()
-        if error:
-            self.logger.error(error)
-            self.logger.error("waiting 120 secs for secrets storage")
-            sleep(120)
-            error = self.load_secrets_sync()
+        self.secrets_from_cache = self.load_secrets_cache()
+        if self.secrets_from_cache:
+            self.logger.info("Secrets were loaded from cache")
+
+    async def bootstrap_secrets(self) -> None:
+        if self.secrets_from_cache:
+            # start with cached secrets, fresh ones are applied in background
+            self.secrets_task = asyncio.create_task(self.refresh_cached_secrets())
+            return
+
+        error = await self.refresh_secrets(get_db=True)
         if error:
             self.logger.error(error)
             sys.exit(1)
 
-        no_secrets = self.apply_secrets(get_db=True)
+    async def refresh_cached_secrets(self) -> None:
+        error = await self.refresh_secrets(get_db=False)
+        if error:
+            self.logger.error(f"{error}, cached secrets are used")
+
+    async def refresh_secrets(self, get_db: bool) -> str:
+        error = await self.load_secrets_with_backoff()
+        if error:
+            return error
+
+        no_secrets = self.apply_secrets(get_db=get_db)
         if no_secrets:
-            self.logger.error(f"No secrets found: {no_secrets}")
-            sys.exit(1)
+            return f"No secrets found: {no_secrets}"
+        await self.save_secrets_cache()
         self.logger.info("Secrets were loaded")
+        return ""
 
     def load_creds_sync(self) -> None:
         with open(self._config_file, "r") as f:
@@ -58,11 +78,52 @@ class ConfigManager:
         async with async_open(self._config_file, "r") as f:
             self.creds_data = yaml.safe_load(await f.read())
 
+    def get_option(self, name: str, default: Any) -> Any:
+        # 0 and false are valid values, only missing options get default
+        value = self.creds_data.get(name)
+        return default if value == None else value
+
     def get_creds(self) -> str:
         try:
             self.SECRETS_DOMAIN = self.creds_data["secrets_domain"] or ""
             self.SECRETS_HEADER = self.creds_data["secrets_header"] or ""
             self.SECRETS_TOKEN = self.creds_data["secrets_token"] or ""
+            self.SECRETS_DEADLINE = float(self.get_option("secrets_deadline", 120))
+            self.SECRETS_CACHE_FILE = (
+                self.creds_data.get("secrets_cache_file") or "config/secrets_cache.json"
+            )
+            self.DB_POOL_SIZE = int(self.get_option("db_pool_size", 5))
+            self.DB_MAX_OVERFLOW = int(self.get_option("db_max_overflow", 10))
+            self.DB_POOL_TIMEOUT = float(self.get_option("db_pool_timeout", 30))
+            self.DB_POOL_RECYCLE = int(self.get_option("db_pool_recycle", -1))
+            self.DB_POOL_PRE_PING = bool(self.get_option("db_pool_pre_ping", False))
+            self.DB_STATEMENT_CACHE_SIZE = int(
+                self.get_option("db_statement_cache_size", 500)
+            )
+            self.DB_PREPARED_STATEMENT_CACHE_SIZE = int(
+                self.get_option("db_prepared_statement_cache_size", 100)
+            )
+            self.HTTP_TIMEOUT = float(self.get_option("http_timeout", 10))
+            self.HTTP_MAX_CONNECTIONS = int(
+                self.get_option("http_max_connections", 100)
+            )
+            self.HTTP_MAX_PER_HOST = int(self.get_option("http_max_per_host", 10))
+            self.HTTP_KEEPALIVE_EXPIRY = float(
+                self.get_option("http_keepalive_expiry", 30)
+            )
+            self.EXTERNAL_TTL = int(self.get_option("external_ttl", 30 * 24 * 3600))
+            self.EXTERNAL_MISS_TTL = int(
+                self.get_option("external_miss_ttl", 24 * 3600)
+            )
+            self.EXTERNAL_CONCURRENCY = int(self.get_option("external_concurrency", 5))
+            self.EXTERNAL_BATCH = int(self.get_option("external_batch", 50))
+            self.DISCORD_BATCH_DELAY = float(self.get_option("discord_batch_delay", 1))
+            self.COUNTERS_BACKEND = self.get_option("counters_backend", "local")
+            self.REDIS_URL = self.get_option("redis_url", "redis://localhost:6379/0")
+            self.COUNTERS_FLUSH_INTERVAL = float(
+                self.get_option("counters_flush_interval", 5)
+            )
+            self.COUNTERS_FLUSH_SIZE = int(self.get_option("counters_flush_size", 50))
         except Exception:
             return "Error getting secrets creds from config-file"
         return ""
@@ -77,10 +138,10 @@ class ConfigManager:
         async with async_open(self._config_file, "w") as f:
             yaml.dump(self.creds_data, f)
 
-    def load_secrets_sync(self) -> str:
+    async def load_secrets_async(self) -> str:
         try:
-            response = requests.get(
-                f"{self.SECRETS_DOMAIN}/api/secrets",
+            response = await get_http_client().get(
+                f"{self.SECRETS_DOMAIN.rstrip('/')}/api/secrets",
                 headers={self.SECRETS_HEADER: self.SECRETS_TOKEN},
             )
             if response.status_code != 200:
@@ -96,23 +157,53 @@ class ConfigManager:
         except Exception:
             return "Error getting secrets from response"
 
-    async def load_secrets_async(self) -> str:
+    async def load_secrets_with_backoff(self) -> str:
+        deadline = time.monotonic() + self.SECRETS_DEADLINE
+        delay = 1
+        while True:
+            error = await self.load_secrets_async()
+            if not error:
+                return ""
+
+            # exponential backoff with jitter, bounded by deadline
+            wait = delay / 2 + random.uniform(0, delay / 2)
+            if time.monotonic() + wait > deadline:
+                return error
+            self.logger.warning(f"{error}, retrying in {wait:.1f} secs")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, 60)
+
+    def load_secrets_cache(self) -> bool:
         try:
-            async with httpx.AsyncClient(
-                base_url=self.SECRETS_DOMAIN,
-                headers={self.SECRETS_HEADER: self.SECRETS_TOKEN},
-            ) as ac:
-                response = await ac.get("/api/secrets")
-                if response.status_code != 200:
-                    return f"Error getting data from secrets response - {response.status_code}"
-        except Exception as e:
-            return f"Error getting data from secrets - {e}"
+            with open(self.SECRETS_CACHE_FILE, "r") as f:
+                self.secrets_data = json.loads(f.read())
+        except Exception:
+            self.secrets_data = {}
+            return False
 
+        no_secrets = self.apply_secrets(get_db=True)
+        if no_secrets:
+            self.logger.warning(f"Cached secrets are incomplete: {no_secrets}")
+            self.secrets_data = {}
+            return False
+        return True
+
+    def write_secrets_cache(self, content: str) -> None:
+        # private from creation, then replaces old cache in one step
+        tmp_file = f"{self.SECRETS_CACHE_FILE}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            os.fchmod(fd, 0o600)
+            f.write(content)
+        os.replace(tmp_file, self.SECRETS_CACHE_FILE)
+
+    async def save_secrets_cache(self) -> None:
         try:
-            self.secrets_data = response.json()["content"]
-            return ""
-        except Exception:
-            return "Error getting secrets from response"
+            await asyncio.to_thread(
+                self.write_secrets_cache, json.dumps(self.secrets_data)
+            )
+        except Exception as e:
+            self.logger.warning(f"Error saving secrets cache - {e}")
 
     def apply_secrets(self, get_db: bool) -> list[str]:
         no_secrets = []
@@ -0,0 +1,172 @@
+import sys
+import time
+from importlib.util import find_spec
+
+from common.config import cfg
+
+# redis backend needs optional redis package
+REDIS = find_spec("redis") != None
+
+_counters = None
+
+
+class LocalCounters:
+    # one process only, every worker has its own values
+    shared = False
+
+    def __init__(self) -> None:
+        self.values = {}
+        self.throttles = {}
+
+    async def load(self, counter_type: str, values: dict[str, int]) -> None:
+        for name, value in values.items():
+            self.values[(counter_type, name)] = value
+
+    async def get(self, counter_type: str, names: list[str]) -> dict[str, int]:
+        return {
+            name: self.values[(counter_type, name)]
+            for name in names
+            if (counter_type, name) in self.values
+        }
+
+    async def set(self, counter_type: str, name: str, value: int) -> None:
+        self.values[(counter_type, name)] = value
+
+    async def delete(self, counter_type: str, names: list[str]) -> None:
+        for name in names:
+            self.values.pop((counter_type, name), None)
+            self.throttles.pop((counter_type, name), None)
+
+    async def clear(self) -> None:
+        self.values = {}
+        self.throttles = {}
+
+    async def incr(self, counter_type: str, name: str, amount: int) -> int:
+        key = (counter_type, name)
+        self.values[key] = self.values.get(key, 0) + amount
+        return self.values[key]
+
+    async def throttle(self, counter_type: str, name: str, seconds: float) -> bool:
+        now = time.monotonic()
+        key = (counter_type, name)
+        if self.throttles.get(key, 0) > now:
+            return False
+        self.throttles[key] = now + seconds
+        return True
+
+    async def refresh_throttle(
+        self, counter_type: str, name: str, seconds: float
+    ) -> None:
+        self.throttles[(counter_type, name)] = time.monotonic() + seconds
+
+    async def ping(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisCounters:
+    # shared by all workers and nodes
+    shared = True
+    PREFIX = "pwsi"
+
+    def __init__(self, url: str) -> None:
+        from redis import asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+
+    def key(self, counter_type: str, name: str) -> str:
+        return f"{self.PREFIX}:counter:{counter_type}:{name}"
+
+    def throttle_key(self, counter_type: str, name: str) -> str:
+        return f"{self.PREFIX}:throttle:{counter_type}:{name}"
+
+    async def load(self, counter_type: str, values: dict[str, int]) -> None:
+        # values already in redis are newer than database ones
+        async with self.client.pipeline(transaction=False) as pipe:
+            for name, value in values.items():
+                pipe.set(self.key(counter_type, name), value, nx=True)
+            await pipe.execute()
+
+    async def get(self, counter_type: str, names: list[str]) -> dict[str, int]:
+        if not names:
+            return {}
+        values = await self.client.mget(
+            [self.key(counter_type, name) for name in names]
+        )
+        return {name: int(value) for name, value in zip(names, values) if value != None}
+
+    async def set(self, counter_type: str, name: str, value: int) -> None:
+        await self.client.set(self.key(counter_type, name), value)
+
+    async def delete(self, counter_type: str, names: list[str]) -> None:
+        keys = [self.key(counter_type, name) for name in names]
+        keys += [self.throttle_key(counter_type, name) for name in names]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def clear(self) -> None:
+        for pattern in ("counter", "throttle"):
+            keys = [
+                key async for key in self.client.scan_iter(f"{self.PREFIX}:{pattern}:*")
+            ]
+            if keys:
+                await self.client.delete(*keys)
+
+    async def incr(self, counter_type: str, name: str, amount: int) -> int:
+        return await self.client.incrby(self.key(counter_type, name), amount)
+
+    async def throttle(self, counter_type: str, name: str, seconds: float) -> bool:
+        # key lives for throttle time, only first caller sets it
+        return bool(
+            await self.client.set(
+                self.throttle_key(counter_type, name),
+                1,
+                nx=True,
+                px=int(seconds * 1000),
+            )
+        )
+
+    async def refresh_throttle(
+        self, counter_type: str, name: str, seconds: float
+    ) -> None:
+        await self.client.set(
+            self.throttle_key(counter_type, name), 1, px=int(seconds * 1000)
+        )
+
+    async def ping(self) -> None:
+        await self.client.ping()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+async def init_counters() -> LocalCounters | RedisCounters:
+    global _counters
+    if _counters == None:
+        if cfg.COUNTERS_BACKEND == "redis":
+            if not REDIS:
+                cfg.logger.error("Redis counters backend needs redis package")
+                sys.exit(1)
+            _counters = RedisCounters(cfg.REDIS_URL)
+        else:
+            _counters = LocalCounters()
+        try:
+            await _counters.ping()
+        except Exception as e:
+            cfg.logger.error(f"Failed to connect to counters backend: {e}")
+            sys.exit(1)
+        cfg.logger.info(f"Counters backend: {cfg.COUNTERS_BACKEND}")
+    return _counters
+
+
+def get_counters() -> LocalCounters | RedisCounters:
+    return _counters
+
+
+async def close_counters() -> None:
+    global _counters
+    if _counters != None:
+        await _counters.close()
+        _counters = None
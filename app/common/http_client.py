@@ -0,0 +1,85 @@
+import asyncio
+from importlib.util import find_spec
+from typing import AsyncIterator
+
+import httpx
+
+# http/2 needs optional h2 package (httpx[http2])
+HTTP2 = find_spec("h2") != None
+
+_client = None
+
+
+class ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self.stream = stream
+        self.semaphore = semaphore
+        self.released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.released:
+                self.released = True
+                self.semaphore.release()
+
+
+class HostLimitedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, max_per_host: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.max_per_host = max_per_host
+        self.semaphores = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        semaphore = self.semaphores[host]
+
+        # slot is held until response body is read and closed
+        await semaphore.acquire()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = ReleasingStream(response.stream, semaphore)
+        return response
+
+
+def init_http_client(
+    timeout: float,
+    max_connections: int,
+    max_per_host: int,
+    keepalive_expiry: float,
+) -> httpx.AsyncClient:
+    global _client
+    if _client == None:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        _client = httpx.AsyncClient(
+            transport=HostLimitedTransport(
+                max_per_host, limits=limits, http2=HTTP2, retries=1
+            ),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5)),
+        )
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client != None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable, Coroutine
+from uuid import uuid4
+
+from common.config import cfg
+from common.errors import HTTPabort
+
+
+class Job:
+    def __init__(self, name: str) -> None:
+        self.id = uuid4().hex
+        self.name = name
+        self.status = "running"
+        self.total = 0
+        self.processed = 0
+        self.result = {}
+        self.error = None
+        self.started = datetime.now(timezone.utc)
+        self.finished = None
+        self.task = None
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "result": self.result,
+            "error": self.error,
+            "started": self.started.isoformat(),
+            "finished": self.finished.isoformat() if self.finished else None,
+        }
+
+
+class Jobs:
+    # finished jobs are kept for polling, older ones are dropped
+    KEEP_FINISHED = 20
+
+    def __init__(self) -> None:
+        self.data = {}
+
+    def start(self, name: str, work: Callable[[Job], Coroutine]) -> Job:
+        for job in self.data.values():
+            if job.name == name and job.status == "running":
+                HTTPabort(409, f"Job {name} is already running")
+
+        job = Job(name)
+        self.data[job.id] = job
+        job.task = asyncio.create_task(self.run(job, work))
+        self.cleanup()
+        return job
+
+    async def run(self, job: Job, work: Callable[[Job], Coroutine]) -> None:
+        try:
+            await work(job)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            cfg.logger.error(f"Job {job.name} ({job.id}) failed: {e}")
+        job.finished = datetime.now(timezone.utc)
+        cfg.logger.info(f"Job {job.name} ({job.id}) {job.status}")
+
+    def cleanup(self) -> None:
+        finished = [job for job in self.data.values() if job.status != "running"]
+        for job in finished[: max(len(finished) - self.KEEP_FINISHED, 0)]:
+            del self.data[job.id]
+
+    def get(self, job_id: str) -> Job:
+        if job_id not in self.data:
+            HTTPabort(404, "Job not found")
+        return self.data[job_id]
+
+    def get_all(self) -> list[dict[str, Any]]:
+        return [job.info() for job in self.data.values()]
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.status != "running":
+            HTTPabort(409, f"Job is {job.status}")
+        job.task.cancel()
+        return job
+
+    async def stop(self) -> None:
+        tasks = [job.task for job in self.data.values() if job.status == "running"]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+jobs = Jobs()
@@ -0,0 +1,212 @@
+import re
+from bisect import bisect_left, insort
+
+WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    # case and ё/е insensitive, punctuation becomes spaces
+    return " ".join(WORD.findall((text or "").lower().replace("ё", "е")))
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[index : index + 3] for index in range(len(text) - 2)}
+
+
+class TextIndex:
+    # word prefix and substring (trigram) lookups over text, exact ones over tags
+    def __init__(self) -> None:
+        self.terms = []
+        self.words = {}
+        self.grams = {}
+        self.tags = {}
+        self.texts = {}
+        self.item_tags = {}
+
+    def add(self, item_id: int, text: str, tags: list[tuple[str, str]]) -> None:
+        text = fold(text)
+        self.texts[item_id] = text
+        for word in set(text.split()):
+            if word not in self.words:
+                self.words[word] = set()
+                insort(self.terms, word)
+            self.words[word].add(item_id)
+        for gram in trigrams(text):
+            self.grams.setdefault(gram, set()).add(item_id)
+
+        folded_tags = {(field, fold(value)) for field, value in tags if fold(value)}
+        self.item_tags[item_id] = folded_tags
+        for tag in folded_tags:
+            self.tags.setdefault(tag, set()).add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        text = self.texts.pop(item_id)
+        for word in set(text.split()):
+            self.words[word].discard(item_id)
+            if not self.words[word]:
+                del self.words[word]
+                del self.terms[bisect_left(self.terms, word)]
+        for gram in trigrams(text):
+            self.grams[gram].discard(item_id)
+            if not self.grams[gram]:
+                del self.grams[gram]
+
+        for tag in self.item_tags.pop(item_id):
+            self.tags[tag].discard(item_id)
+            if not self.tags[tag]:
+                del self.tags[tag]
+
+    def prefixed(self, prefix: str) -> set[int]:
+        found = set()
+        position = bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            found |= self.words[self.terms[position]]
+            position += 1
+        return found
+
+    def match_text(self, query: str) -> set[int]:
+        query = fold(query)
+        if not query:
+            return set()
+
+        # every query word starts some word of item
+        found = None
+        for word in query.split():
+            matched = self.prefixed(word)
+            found = matched if found == None else found & matched
+            if not found:
+                break
+
+        if len(query) >= 3:
+            postings = sorted(
+                (self.grams.get(gram, set()) for gram in trigrams(query)), key=len
+            )
+            candidates = set.intersection(*postings)
+            found |= {item_id for item_id in candidates if query in self.texts[item_id]}
+        return found
+
+    def match_tag(self, field: str, value: str) -> set[int]:
+        return set(self.tags.get((field, fold(value)), ()))
+
+
+CYRILLIC = re.compile(r"[а-я]")
+# longest endings first, only one is cut
+RU_ENDINGS = sorted(
+    (
+        "иями ями ами ого его ому ему ыми ими ых их ой ей ий ый ая яя ое ее ые ие "
+        "ую юю ом ем ам ям ах ях ов ев ть а я о е ы и у ю ь й"
+    ).split(),
+    key=len,
+    reverse=True,
+)
+EN_ENDINGS = ("ing", "ed", "es", "s")
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    endings = RU_ENDINGS if CYRILLIC.search(word) else EN_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+class SearchIndex:
+    # stemmed words of all domains, keys are (type, id)
+    def __init__(self) -> None:
+        self.stems = []
+        self.postings = {}
+        self.documents = {}
+        self.typed = {}
+
+    def set(self, key: tuple, fields: list[tuple[str, int]], hit: dict) -> None:
+        if self.documents.get(key) == (fields, hit):
+            return
+        if key in self.documents:
+            self.remove(key)
+
+        weights = {}
+        for text, weight in fields:
+            for word in fold(text).split():
+                word_stem = stem(word)
+                weights[word_stem] = max(weights.get(word_stem, 0), weight)
+        for word_stem, weight in weights.items():
+            if word_stem not in self.postings:
+                self.postings[word_stem] = {}
+                insort(self.stems, word_stem)
+            self.postings[word_stem][key] = weight
+        self.documents[key] = (fields, hit)
+        self.typed.setdefault(key[0], set()).add(key)
+
+    def remove(self, key: tuple) -> None:
+        fields, _ = self.documents.pop(key)
+        for text, _ in fields:
+            for word in fold(text).split():
+                word_stem = stem(word)
+                postings = self.postings.get(word_stem)
+                if postings == None:
+                    continue
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[word_stem]
+                    del self.stems[bisect_left(self.stems, word_stem)]
+        self.typed[key[0]].discard(key)
+        if not self.typed[key[0]]:
+            del self.typed[key[0]]
+
+    def replace(self, item_type: str, entries: dict) -> None:
+        for key in self.typed.get(item_type, set()) - {
+            (item_type, item_id) for item_id in entries
+        }:
+            self.remove(key)
+        for item_id, (fields, hit) in entries.items():
+            self.set((item_type, item_id), fields, hit)
+
+    def matches(self, word: str) -> dict[tuple, float]:
+        word_stem = stem(word)
+        found = dict(self.postings.get(word_stem, {}))
+        if len(word) < 2:
+            return found
+        # unfinished words match longer ones with half weight
+        position = bisect_left(self.stems, word_stem)
+        while position < len(self.stems) and self.stems[position].startswith(word_stem):
+            if self.stems[position] != word_stem:
+                for key, weight in self.postings[self.stems[position]].items():
+                    found[key] = max(found.get(key, 0), weight / 2)
+            position += 1
+        return found
+
+    def search(self, query: str, types: list[str], limit: int) -> list[dict]:
+        query = fold(query)
+        scores = None
+        for word in query.split():
+            matched = self.matches(word)
+            if scores == None:
+                scores = matched
+            else:
+                scores = {
+                    key: score + matched[key]
+                    for key, score in scores.items()
+                    if key in matched
+                }
+            if not scores:
+                return []
+        if scores == None:
+            return []
+
+        hits = []
+        for key, score in scores.items():
+            if types and key[0] not in types:
+                continue
+            fields, hit = self.documents[key]
+            title = fold(fields[0][0])
+            if title == query:
+                score += 10
+            elif title.startswith(query):
+                score += 5
+            hits.append({"type": key[0], "id": key[1], **hit, "score": score})
+        hits.sort(key=lambda hit: (-hit["score"], fold(hit["title"]), hit["type"]))
+        return hits[:limit]
+
+
+site_search = SearchIndex()
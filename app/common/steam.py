@@ -0,0 +1,56 @@
+import asyncio
+
+from common.config import cfg
+from common.http_client import get_http_client
+
+PICTURE_TEMPLATES = (
+    "https://cdn.akamai.steamstatic.com/steam/apps/{}/capsule_616x353.jpg",
+    "https://cdn.akamai.steamstatic.com/steam/apps/{}/header.jpg",
+    "https://cdn.cloudflare.steamstatic.com/steam/apps/{}/header.jpg",
+    "https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{}/header.jpg",
+    "https://shared.cloudflare.steamstatic.com/store_item_assets/steam/apps/{}/header.jpg",
+)
+
+
+async def picture_exists(url: str) -> bool | None:
+    client = get_http_client()
+    try:
+        response = await client.head(url)
+        if response.status_code in (405, 501):
+            # no HEAD support: ask only for first byte of picture
+            headers = {"Range": "bytes=0-0"}
+            async with client.stream("GET", url, headers=headers) as response:
+                pass
+            return response.status_code in (200, 206)
+        return response.status_code == 200
+    except Exception:
+        cfg.logger.warning(f"Error checking steam pic {url}")
+        return None
+
+
+async def find_picture(steam_id: int) -> tuple[str | None, bool]:
+    urls = [template.format(steam_id) for template in PICTURE_TEMPLATES]
+    probes = [asyncio.ensure_future(picture_exists(url)) for url in urls]
+    try:
+        # all pictures are probed at once, first existing one by priority wins
+        checked = True
+        for url, probe in zip(urls, probes):
+            exists = await probe
+            if exists:
+                return url, True
+            if exists == None:
+                checked = False
+        return None, checked
+    finally:
+        for probe in probes:
+            probe.cancel()
+
+
+async def get_steam_info(steam_id: int) -> tuple[dict, bool]:
+    result = {"link": f"https://store.steampowered.com/app/{steam_id}"}
+    picture, checked = await find_picture(steam_id)
+    if picture:
+        result["picture"] = picture
+    else:
+        cfg.logger.warning(f"No valid pic for steam-game {steam_id}")
+    return result, checked
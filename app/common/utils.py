@@ -1,13 +1,29 @@
+import base64
 import getopt
+import gzip
+import hashlib
 import logging
+import random
 import sys
+from datetime import date, datetime
+from datetime import time as dtime
 from types import SimpleNamespace
+from typing import Any
+
+import brotli
+import orjson
 
 levelDEBUG = logging.DEBUG
 # levelDEBUG = logging.INFO
 levelINFO = logging.INFO
 FORMAT = "%(levelname)-8s\t%(asctime)s\t\t%(message)s"
 
+# smaller payloads are sent without compression
+COMPRESS_MIN_SIZE = 1024
+
+# seeded once from system entropy, shared by all twitchbot commands
+rng = random.Random()
+
 
 def get_args() -> SimpleNamespace:
     args = SimpleNamespace(env="dev", host="0.0.0.0", port=8040)
@@ -34,3 +50,66 @@ def disable_unnecessary_loggers() -> None:
 
     httpx_logger = logging.getLogger("httpx")
     httpx_logger.setLevel(logging.CRITICAL)
+
+
+def content_tag(content: bytes) -> str:
+    # same content gives same tag in every worker and after restarts
+    return hashlib.blake2b(content, digest_size=12).hexdigest()
+
+
+def json_default(value: Any) -> Any:
+    # datetimes as "YYYY-MM-DD HH:MM:SS+TZ", like before orjson
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, (date, dtime)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dump_json(data: Any) -> bytes:
+    # compact utf-8, same bytes as starlette's JSONResponse.render
+    return orjson.dumps(
+        data,
+        default=json_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+def jsonable(data: Any) -> Any:
+    # copy of data with json types only
+    return orjson.loads(dump_json(data))
+
+
+def dump_json_dict(parts: dict[str, bytes]) -> bytes:
+    return (
+        b"{"
+        + b",".join(dump_json(key) + b":" + value for key, value in parts.items())
+        + b"}"
+    )
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    # middle levels: close to best size, fast enough to do once per version
+    if encoding == "br":
+        return brotli.compress(data, quality=6)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def tuplify(data: Any) -> Any:
+    if isinstance(data, list):
+        return tuple(tuplify(value) for value in data)
+    return data
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(dump_json(key)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    # sort keys are tuples, json gives them back as lists
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return tuplify(orjson.loads(base64.urlsafe_b64decode(padded)))
+
+
+def wrap_content(encoded: bytes) -> bytes:
+    return b'{"content":' + encoded + b"}"
@@ -0,0 +1,549 @@
+import asyncio
+import time
+from bisect import bisect_right
+from typing import Any
+
+from common.config import cfg
+from common.errors import HTTPabort
+from common.jobs import Job
+from common.search import site_search
+from common.utils import (
+    compress,
+    content_tag,
+    decode_cursor,
+    encode_cursor,
+    jsonable,
+    wrap_content,
+)
+from crud._orders import (
+    changed_group_orders,
+    group_orders,
+    insert_order,
+    move_order,
+    remove_order,
+)
+from db.common import (
+    delete_rows,
+    get_engine,
+    get_model_dict,
+    get_row_dict,
+    insert_rows,
+    update_rows,
+)
+from db.models import SCHEMA
+from db.notify import notify
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
+
+
+class BaseData:
+    model: Any = None
+    title = ""
+    raw_tags: tuple[str, ...] = ()
+    # column with unique values, kept in self.uniques
+    unique: str | None = None
+    # "order" column, numbered from 1 inside each group
+    ordered = False
+    # column with id of parent element, children are deleted with parent
+    order_group: str | None = None
+    # children without order are kept out of numbering
+    nullable_order = False
+    # where pictures for update_pictures come from
+    picture_source = ""
+    # empty fields filled from fetch_info after adding
+    enrich_fields: tuple[str, ...] = ()
+    # hit type in site search, domain isn't searchable without it
+    search_type = ""
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.uniques = set()
+        self.sorted_list = []
+        self.payload = b""
+        self.version = 0
+        self.etag = content_tag(b"")
+        # compressed payloads of current version, made on first request
+        self.encoded = {}
+        self.encoded_version = -1
+        # raw list is built once per published version
+        self.raw_list = []
+        self.raw_version = -1
+        self.resort_ms = 0
+        self.lock = asyncio.Lock()
+        self.enrich_queue = asyncio.Queue()
+        self.enrich_task = None
+        # all_data name, used in notifications for other workers
+        self.name = ""
+        # ids to reindex on next publish, None means all
+        self.search_changed = None
+
+    async def setup(self, session: AsyncSession) -> None:
+        async with session.begin():
+            db_data = await session.scalars(select(self.model))
+            for row in db_data:
+                self.data[row.id] = get_model_dict(row)
+        started = time.perf_counter()
+        self.rebuild()
+        self.resort_ms = (time.perf_counter() - started) * 1000
+        cfg.logger.info(f"{self.title} info was loaded to memory")
+
+    async def reset(self, session: AsyncSession) -> None:
+        async with self.lock:
+            async with session.begin():
+                await session.execute(
+                    text(
+                        f"TRUNCATE TABLE {SCHEMA}.{self.model.__table__.name} RESTART IDENTITY;"
+                    )
+                )
+                await notify(session, self.name)
+            self.data = {}
+            self.rebuild()
+
+    async def reload(self, session: AsyncSession, ids: list[int] | None) -> None:
+        async with self.lock:
+            async with session.begin():
+                query = select(self.model)
+                if ids != None:
+                    query = query.where(self.model.id.in_(ids))
+                db_data = await session.scalars(query)
+                fresh = {row.id: get_model_dict(row) for row in db_data}
+            if ids == None:
+                self.data = fresh
+                self.rebuild()
+                return
+
+            self.mark_changed(ids)
+            for item_id in dict.fromkeys(ids):
+                if item_id in self.data and item_id in fresh:
+                    self.patch(self.data[item_id], fresh[item_id])
+                elif item_id in self.data:
+                    self.forget(self.data.pop(item_id))
+                elif item_id in fresh:
+                    self.data[item_id] = fresh[item_id]
+                    self.remember(fresh[item_id])
+            if self.unique:
+                self.uniques = {item[self.unique] for item in self.data.values()}
+            self.publish()
+
+    def rebuild(self) -> None:
+        if self.unique:
+            self.uniques = {item[self.unique] for item in self.data.values()}
+        self.search_changed = None
+        self.resort()
+
+    def resort(self) -> None:
+        raise NotImplementedError
+
+    def publish(self) -> None:
+        self.resort()
+
+    def store_payload(self, encoded: bytes) -> None:
+        self.payload = wrap_content(encoded)
+        self.version += 1
+        self.etag = content_tag(self.payload)
+        self.sync_search()
+
+    def mark_changed(self, ids: list[int]) -> None:
+        if self.search_changed != None:
+            self.search_changed.update(ids)
+
+    def search_entry(self, item: dict) -> tuple[list[tuple[str, int]], dict]:
+        raise NotImplementedError
+
+    def sync_search(self) -> None:
+        if self.search_type:
+            if self.search_changed == None:
+                site_search.replace(
+                    self.search_type,
+                    {
+                        item_id: self.search_entry(item)
+                        for item_id, item in self.data.items()
+                    },
+                )
+            else:
+                for item_id in self.search_changed:
+                    key = (self.search_type, item_id)
+                    if item_id in self.data:
+                        site_search.set(key, *self.search_entry(self.data[item_id]))
+                    elif key in site_search.documents:
+                        site_search.remove(key)
+        self.search_changed = set()
+
+    def group_of(self, item: dict) -> Any:
+        return item[self.order_group] if self.order_group else None
+
+    def group_orders(self) -> dict[Any, dict]:
+        if not self.ordered:
+            return {}
+        return group_orders(self.data, self.order_group)
+
+    def forget(self, item: dict) -> None:
+        pass
+
+    def remember(self, item: dict) -> None:
+        pass
+
+    async def prepare_new(self, element: BaseModel) -> dict:
+        return element.model_dump()
+
+    async def prepare_update(self, item_id: int, dicted_element: dict) -> dict:
+        return dicted_element
+
+    async def add(self, session: AsyncSession, elements: list[BaseModel]) -> list[int]:
+        if not elements:
+            return HTTPabort(422, "Empty list")
+        async with self.lock:
+            inserted_ids = []
+            groups = self.group_orders()
+            uniques = set(self.uniques)
+            new_elements = []
+            for element in elements:
+                parent_id = (
+                    getattr(element, self.order_group) if self.order_group else None
+                )
+                if parent_id and parent_id not in self.data:
+                    inserted_ids.append(-1)
+                    continue
+                if self.unique and getattr(element, self.unique) in uniques:
+                    inserted_ids.append(-1)
+                    continue
+
+                dicted_element = await self.prepare_new(element)
+                if self.unique:
+                    uniques.add(dicted_element[self.unique])
+                if self.ordered and (
+                    element.order or not (self.nullable_order and parent_id)
+                ):
+                    group = self.group_of(dicted_element)
+                    if group not in groups:
+                        groups[group] = {}
+                    key = ("new", len(new_elements))
+                    insert_order(groups[group], key, element.order)
+
+                inserted_ids.append(len(new_elements))
+                new_elements.append(dicted_element)
+            if not new_elements and self.unique:
+                HTTPabort(409, "Elements already exist")
+            for index, dicted_element in enumerate(new_elements):
+                orders = groups.get(self.group_of(dicted_element), {})
+                if ("new", index) in orders:
+                    dicted_element["order"] = orders.pop(("new", index))
+            rows = changed_group_orders(groups, self.data)
+
+            async with session.begin():
+                await update_rows(session, self.model, rows)
+                new_ids = await insert_rows(session, self.model, new_elements)
+                await notify(
+                    session, self.name, [*new_ids, *(row["id"] for row in rows)]
+                )
+
+            for row in rows:
+                self.data[row["id"]].update(row)
+            for item_id, dicted_element in zip(new_ids, new_elements):
+                dicted_element["id"] = item_id
+                self.data[item_id] = get_row_dict(self.model, dicted_element)
+            self.mark_changed(new_ids)
+            self.uniques = uniques
+            self.publish()
+            return [new_ids[index] if index != -1 else -1 for index in inserted_ids]
+
+    async def delete(
+        self, session: AsyncSession, elements: list[BaseModel]
+    ) -> list[bool]:
+        if not elements:
+            return HTTPabort(422, "Empty list")
+        async with self.lock:
+            delete_info = []
+            groups = self.group_orders()
+            ids_for_delete = []
+            for element in elements:
+                if element.id not in self.data or element.id in ids_for_delete:
+                    delete_info.append(False)
+                    continue
+                if self.ordered:
+                    remove_order(
+                        groups[self.group_of(self.data[element.id])], element.id
+                    )
+                if self.order_group:
+                    groups.pop(element.id, None)
+                    for item_id, item in self.data.items():
+                        if item[self.order_group] == element.id:
+                            ids_for_delete.append(item_id)
+                ids_for_delete.append(element.id)
+                delete_info.append(True)
+            if True not in delete_info:
+                HTTPabort(404, "No elements to delete")
+            # child can be queued by itself and again with its parent
+            ids_for_delete = list(dict.fromkeys(ids_for_delete))
+            rows = changed_group_orders(groups, self.data)
+
+            async with session.begin():
+                await delete_rows(session, self.model, ids_for_delete)
+                await update_rows(session, self.model, rows)
+                await notify(
+                    session, self.name, [*ids_for_delete, *(row["id"] for row in rows)]
+                )
+
+            for item_id in ids_for_delete:
+                item = self.data.pop(item_id)
+                if self.unique:
+                    self.uniques.remove(item[self.unique])
+                self.forget(item)
+            self.mark_changed(ids_for_delete)
+            for row in rows:
+                self.data[row["id"]].update(row)
+            self.publish()
+            return delete_info
+
+    async def update(
+        self, session: AsyncSession, elements: list[BaseModel]
+    ) -> list[str]:
+        if not elements:
+            return HTTPabort(422, "Empty list")
+        async with self.lock:
+            update_info = []
+            not_unique = f"New {self.unique} not unique"
+            groups = self.group_orders()
+            uniques = set(self.uniques)
+            # changes of previous elements of this request
+            staged = {}
+            rows = []
+            for element in elements:
+                if element.id not in self.data:
+                    update_info.append("No element")
+                    continue
+                dicted_element = element.model_dump(
+                    exclude={"id", "order"}, exclude_none=True
+                )
+                if self.unique and dicted_element.get(self.unique) in uniques:
+                    update_info.append(not_unique)
+                    continue
+
+                item = {**self.data[element.id], **staged.get(element.id, {})}
+                if self.unique and self.unique in dicted_element:
+                    uniques.remove(item[self.unique])
+                    uniques.add(dicted_element[self.unique])
+                if self.ordered:
+                    group = self.group_of(item)
+                    if self.order_group and self.order_group in dicted_element:
+                        # moved element goes to the end of the new group
+                        numbered = element.id in groups[group]
+                        remove_order(groups[group], element.id)
+                        group = dicted_element[self.order_group]
+                        if group not in groups:
+                            groups[group] = {}
+                        if numbered or not self.nullable_order:
+                            insert_order(groups[group], element.id, None)
+                    if element.order != None:
+                        move_order(groups[group], element.id, element.order)
+
+                dicted_element = await self.prepare_update(element.id, dicted_element)
+                if element.id not in staged:
+                    staged[element.id] = {}
+                staged[element.id].update(dicted_element)
+                rows.append({**dicted_element, "id": element.id})
+                update_info.append("Updated")
+            if "Updated" not in update_info:
+                if not_unique not in update_info:
+                    HTTPabort(404, "No elements to update")
+                if "No element" not in update_info:
+                    HTTPabort(409, f"No new unique {self.unique}s")
+            rows.extend(changed_group_orders(groups, self.data))
+
+            async with session.begin():
+                await update_rows(session, self.model, rows)
+                await notify(session, self.name, [row["id"] for row in rows])
+
+            for row in rows:
+                self.data[row["id"]].update(row)
+            self.mark_changed([row["id"] for row in rows])
+            self.uniques = uniques
+            self.publish()
+            return update_info
+
+    async def fetch_info(self, item_id: int) -> dict:
+        return {}
+
+    def patch(self, item: dict, values: dict) -> None:
+        item.update(values)
+
+    def has_external_picture(self, item: dict) -> bool:
+        return False
+
+    def can_enrich(self, item: dict) -> bool:
+        return True
+
+    async def fetch_infos(self, ids: list[int], job: Job | None = None) -> list[dict]:
+        # network calls go without lock
+        semaphore = asyncio.Semaphore(cfg.EXTERNAL_CONCURRENCY)
+
+        async def fetch(item_id: int) -> dict:
+            async with semaphore:
+                info = await self.fetch_info(item_id)
+            if job:
+                job.processed += 1
+            return info
+
+        return await asyncio.gather(*(fetch(item_id) for item_id in ids))
+
+    async def save_patches(self, rows: list[dict]) -> None:
+        async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+            async with session.begin():
+                await update_rows(session, self.model, rows)
+                await notify(session, self.name, [row["id"] for row in rows])
+            # before closing session, so cancellation keeps memory in sync
+            for row in rows:
+                values = {key: value for key, value in row.items() if key != "id"}
+                self.patch(self.data[row["id"]], values)
+            self.mark_changed([row["id"] for row in rows])
+            self.publish()
+
+    async def update_pictures(self, job: Job, ids: list[int]) -> None:
+        async with self.lock:
+            pictures = {
+                item_id: item["picture"]
+                for item_id, item in self.data.items()
+                if (not ids or item_id in ids) and self.has_external_picture(item)
+            }
+            for item_id in ids:
+                if item_id not in self.data:
+                    job.result[item_id] = "Not found"
+                elif item_id not in pictures:
+                    job.result[item_id] = "Not updated"
+        job.total = len(pictures)
+
+        queue = list(pictures)
+        for start in range(0, len(queue), cfg.EXTERNAL_BATCH):
+            batch = queue[start : start + cfg.EXTERNAL_BATCH]
+            infos = await self.fetch_infos(batch, job)
+            async with self.lock:
+                rows = []
+                for item_id, info in zip(batch, infos):
+                    picture = info.get("picture")
+                    if not picture:
+                        job.result[item_id] = f"No {self.picture_source} picture"
+                    elif (
+                        item_id not in self.data
+                        or self.data[item_id]["picture"] != pictures[item_id]
+                    ):
+                        job.result[item_id] = "Changed during update"
+                    elif picture != pictures[item_id]:
+                        rows.append({"id": item_id, "picture": picture})
+                    elif ids:
+                        job.result[item_id] = "Not updated"
+                if rows:
+                    await self.save_patches(rows)
+                    for row in rows:
+                        job.result[row["id"]] = "Updated"
+
+    def enrich_later(self, ids: list[int]) -> None:
+        for item_id in ids:
+            self.enrich_queue.put_nowait(item_id)
+        if self.enrich_task == None or self.enrich_task.done():
+            self.enrich_task = asyncio.create_task(self.enrich_worker())
+
+    def enrich_missing(self) -> None:
+        # queue is in memory, items added before a restart are found by empty fields
+        if not self.enrich_fields:
+            return
+        ids = [
+            item_id
+            for item_id, item in self.data.items()
+            if self.can_enrich(item)
+            and any(not item[key] for key in self.enrich_fields)
+        ]
+        if ids:
+            self.enrich_later(ids)
+
+    async def enrich_worker(self) -> None:
+        while not self.enrich_queue.empty():
+            batch = []
+            while not self.enrich_queue.empty() and len(batch) < cfg.EXTERNAL_BATCH:
+                batch.append(self.enrich_queue.get_nowait())
+            try:
+                await self.enrich(batch)
+            except Exception as e:
+                cfg.logger.error(f"Error getting {self.title} info {batch}: {e}")
+
+    async def enrich(self, ids: list[int]) -> None:
+        infos = await self.fetch_infos(ids)
+        async with self.lock:
+            rows = []
+            for item_id, info in zip(ids, infos):
+                item = self.data.get(item_id)
+                if item == None:
+                    continue
+                # only fields still empty, values set meanwhile are kept
+                values = {
+                    key: info[key]
+                    for key in self.enrich_fields
+                    if not item[key] and info.get(key)
+                }
+                if values:
+                    rows.append({**values, "id": item_id})
+            if rows:
+                await self.save_patches(rows)
+
+    async def stop(self) -> None:
+        if self.enrich_task != None:
+            self.enrich_task.cancel()
+            await asyncio.gather(self.enrich_task, return_exceptions=True)
+            self.enrich_task = None
+
+    def get_payload(self) -> bytes:
+        return self.payload
+
+    def project(self, items: list[dict], fields: list[str]) -> list[dict]:
+        if not fields:
+            return items
+        return [
+            {field: item[field] for field in fields if field in item} for item in items
+        ]
+
+    def get_page(
+        self,
+        keys: list[tuple],
+        items: list[dict],
+        limit: int,
+        cursor: str | None,
+        fields: list[str],
+    ) -> dict[str, Any]:
+        # cursor is sort key of last sent item, so inserts don't shift pages
+        start = 0
+        if cursor:
+            try:
+                start = bisect_right(keys, decode_cursor(cursor))
+            except Exception:
+                HTTPabort(422, "Invalid cursor")
+        page = items[start : start + limit]
+        next_cursor = None
+        if start + limit < len(items):
+            next_cursor = encode_cursor(keys[start + limit - 1])
+        return {"items": self.project(page, fields), "next_cursor": next_cursor}
+
+    def get_encoded(self, encoding: str) -> bytes:
+        if self.encoded_version != self.version:
+            self.encoded = {}
+            self.encoded_version = self.version
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.payload, encoding)
+        return self.encoded[encoding]
+
+    def raw_record(self, item: dict) -> dict:
+        return {tag: item[tag] for tag in self.raw_tags}
+
+    async def get_raw(self) -> list[dict]:
+        # no lock: data is changed only between awaits, new list replaces old one
+        if self.raw_version != self.version:
+            self.raw_list = jsonable(
+                [self.raw_record(item) for item in self.data.values()]
+            )
+            self.raw_version = self.version
+        return self.raw_list
+
+    async def get_all(self, raw: bool) -> list:
+        if raw:
+            return await self.get_raw()
+        return self.sorted_list
@@ -0,0 +1,61 @@
+from typing import Any
+
+
+def group_orders(data: dict[Any, dict], group_key: str | None) -> dict[Any, dict]:
+    groups = {None: {}}
+    for key, element in data.items():
+        group = element[group_key] if group_key else None
+        if group not in groups:
+            groups[group] = {}
+        if element["order"]:
+            groups[group][key] = element["order"]
+    return groups
+
+
+def insert_order(orders: dict[Any, int], key: Any, order: int | None) -> int:
+    if order and 1 <= order <= len(orders) + 1:
+        for other_key in orders:
+            if orders[other_key] >= order:
+                orders[other_key] += 1
+    else:
+        order = len(orders) + 1
+    orders[key] = order
+    return order
+
+
+def remove_order(orders: dict[Any, int], key: Any) -> None:
+    order = orders.pop(key, None)
+    if order == None:
+        return
+    for other_key in orders:
+        if orders[other_key] > order:
+            orders[other_key] -= 1
+
+
+def move_order(orders: dict[Any, int], key: Any, order: int) -> bool:
+    if key not in orders or not 1 <= order <= len(orders):
+        return False
+
+    current_order = orders[key]
+    for other_key in orders:
+        if order <= orders[other_key] < current_order:
+            orders[other_key] += 1
+        elif current_order < orders[other_key] <= order:
+            orders[other_key] -= 1
+    orders[key] = order
+    return True
+
+
+def changed_orders(orders: dict[Any, int], data: dict[Any, dict]) -> list[dict]:
+    return [
+        {"id": key, "order": order}
+        for key, order in orders.items()
+        if key in data and data[key]["order"] != order
+    ]
+
+
+def changed_group_orders(groups: dict[Any, dict], data: dict[Any, dict]) -> list[dict]:
+    rows = []
+    for orders in groups.values():
+        rows.extend(changed_orders(orders, data))
+    return rows
@@ -1,29 +1,52 @@
-import asyncio
-from datetime import date as ddate
-from datetime import datetime
-from datetime import time as dtime
-from datetime import timezone
+from bisect import bisect_left
+from datetime import datetime, timezone
 
-import httpx
 from common.config import cfg
 from common.errors import HTTPabort
-from db.common import get_model_dict
-from db.models import SCHEMA, Anime
-from fastapi.encoders import jsonable_encoder
+from common.http_client import get_http_client
+from common.utils import dump_json, jsonable
+from crud._base import BaseData
+from crud.external import external_data
+from db.common import get_row_dict, insert_rows, update_rows
+from db.models import Anime
+from db.notify import notify
 from schemas import anime as schema_anime
-from sqlalchemy import delete, select, update
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import text
 
 UNIX_ZERO = datetime.fromisoformat("1970-01-01 00:00+00:00")
 UNIX_BELOW_ZERO = datetime.fromisoformat("1969-12-31 23:59:59+00:00")
 
 
-class AnimeData:
+class AnimeData(BaseData):
+    model = Anime
+    title = "Anime"
+    search_type = "anime"
+    picture_source = "MAL"
+    enrich_fields = ("link", "type", "episodes", "picture")
+    raw_tags = (
+        "id",
+        "series",
+        "name",
+        "order_by",
+        "voice_acting",
+        "status",
+        "comment",
+        "score",
+        "added_time",
+        "completed_time",
+        "picture_mode",
+    )
+
     def __init__(self) -> None:
-        self.data = {}
-        self.sorted_list = []
-        self.lock = asyncio.Lock()
+        super().__init__()
+        self.series = {}
+        self.positions = {}
+        self.next_position = 0
+        self.entries = {}
+        self.changed_entries = set()
+        self.sorted_keys = []
+        self.fragments = []
         self.status_mapping = {
             "Смотрим": 1,
             "": 2,
@@ -39,49 +62,34 @@ class AnimeData:
         self.non_mal_border = 1000 * 1000 * 1000 * 1000
         self.non_mal_anime = 1000 * 1000 * 1000 * 1000
 
-    async def setup(self, session: AsyncSession) -> None:
-        async with session.begin():
-            db_data = await session.scalars(select(Anime))
-            for row in db_data:
-                if row.id > self.non_mal_border and row.id > self.non_mal_anime:
-                    self.non_mal_anime = row.id
-                self.data[row.id] = get_model_dict(row)
-        self.resort()
-        cfg.logger.info("Anime info was loaded to memory")
-
-    async def reset(self, session: AsyncSession) -> None:
-        async with self.lock:
-            async with session.begin():
-                await session.execute(
-                    text(
-                        f"TRUNCATE TABLE {SCHEMA}.{Anime.__table__.name} RESTART IDENTITY;"
-                    )
-                )
-            self.data = {}
-            self.sorted_list = []
-            self.non_mal_anime = self.non_mal_border
+    def rebuild(self) -> None:
+        self.non_mal_anime = max([self.non_mal_border, *self.data])
+        super().rebuild()
 
     async def get_anime_mal_info(self, id: int) -> dict:
+        return await external_data.get("mal", id, self.load_mal_info)
+
+    async def load_mal_info(self, id: int) -> tuple[dict, bool]:
         try:
-            async with httpx.AsyncClient(
-                base_url=cfg.MAL_API,
+            response = await get_http_client().get(
+                f"{cfg.MAL_API.rstrip('/')}/anime/{id}",
                 params={"fields": "mean,media_type,status,num_episodes"},
                 headers={cfg.MAL_HEADER: cfg.MAL_CLIENT_ID},
-            ) as ac:
-                response = await ac.get(f"/anime/{id}")
-                if response.status_code != 200:
-                    details = ""
-                    try:
-                        details = str(response.json())
-                    except Exception:
-                        pass
-                    cfg.logger.warning(
-                        f"Error getting anime {id} info. Code: {response.status_code}, Details: {details}."
-                    )
-                    return {}
+            )
+            if response.status_code != 200:
+                details = ""
+                try:
+                    details = str(response.json())
+                except Exception:
+                    pass
+                cfg.logger.warning(
+                    f"Error getting anime {id} info. Code: {response.status_code}, Details: {details}."
+                )
+                # only missing anime is cached, other errors may pass
+                return {}, response.status_code == 404
         except Exception:
             cfg.logger.warning(f"Error getting anime {id} info from MAL api")
-            return {}
+            return {}, False
 
         try:
             anime_info = response.json()
@@ -92,109 +100,174 @@ class AnimeData:
                     anime_info["media_type"].lower(), anime_info["media_type"]
                 ),
                 "episodes": anime_info["num_episodes"],
-            }
+            }, True
         except Exception:
             cfg.logger.warning(f"Error getting anime {id} details from API response")
-            return {}
-
-    def resort(self) -> None:
-        seriesed = {}
-        for anime in self.data.values():
-            if anime["series"]:
-                if anime["series"] not in seriesed:
-                    seriesed[anime["series"]] = {
-                        "name": anime["series"],
-                        "status": anime["status"],
-                        "added_time": anime["added_time"],
-                        "completed_time": anime["completed_time"],
-                        "list": [anime],
-                    }
-                    if anime["score"]:
-                        seriesed[anime["series"]]["score_sum"] = anime["score"]
-                        seriesed[anime["series"]]["score_count"] = 1
-                    continue
+            return {}, True
+
+    def entry_key(self, anime: dict) -> tuple:
+        if anime["series"]:
+            return ("series", anime["series"])
+        return ("anime", anime["id"])
+
+    def link(self, anime: dict) -> None:
+        # series are folded in the same order as self.data
+        if anime["id"] not in self.positions:
+            self.positions[anime["id"]] = self.next_position
+            self.next_position += 1
+
+        if anime["series"]:
+            if anime["series"] not in self.series:
+                self.series[anime["series"]] = set()
+            self.series[anime["series"]].add(anime["id"])
+        self.mark_changed([anime["id"]])
+        self.changed_entries.add(self.entry_key(anime))
+
+    def unlink(self, anime: dict, forget: bool = False) -> None:
+        if forget:
+            del self.positions[anime["id"]]
+
+        if anime["series"]:
+            self.series[anime["series"]].remove(anime["id"])
+            if not self.series[anime["series"]]:
+                del self.series[anime["series"]]
+        self.mark_changed([anime["id"]])
+        self.changed_entries.add(self.entry_key(anime))
+
+    def build_series(self, name: str) -> dict:
+        series = None
+        for anime_id in sorted(self.series[name], key=self.positions.get):
+            anime = self.data[anime_id]
+            if series == None:
+                series = {
+                    "name": name,
+                    "status": anime["status"],
+                    "added_time": anime["added_time"],
+                    "completed_time": anime["completed_time"],
+                    "list": [anime],
+                }
+                if anime["score"]:
+                    series["score_sum"] = anime["score"]
+                    series["score_count"] = 1
+                continue
 
-                curr_series = seriesed[anime["series"]]
-                updated_data = {}
+            updated_data = {}
 
-                if curr_series["status"] != anime["status"]:
-                    updated_data["status"] = "Смотрим"
-                    updated_data["completed_time"] = None
+            if series["status"] != anime["status"]:
+                updated_data["status"] = "Смотрим"
+                updated_data["completed_time"] = None
 
-                if (
-                    curr_series["status"] == "Заброшено"
-                    or anime["status"] == "Заброшено"
-                ):
-                    updated_data["status"] = "Заброшено"
-                    if (anime["completed_time"] or UNIX_ZERO) > (
-                        curr_series["completed_time"] or UNIX_ZERO
-                    ):
-                        updated_data["completed_time"] = anime["completed_time"]
-                    else:
-                        updated_data["completed_time"] = curr_series["completed_time"]
-
-                if curr_series["status"] == anime["status"] == "Просмотрено":
-                    if anime["completed_time"] > curr_series["completed_time"]:
-                        updated_data["completed_time"] = anime["completed_time"]
-
-                if (anime["added_time"] or UNIX_ZERO) < (
-                    curr_series["added_time"] or UNIX_ZERO
+            if series["status"] == "Заброшено" or anime["status"] == "Заброшено":
+                updated_data["status"] = "Заброшено"
+                if (anime["completed_time"] or UNIX_ZERO) > (
+                    series["completed_time"] or UNIX_ZERO
                 ):
-                    updated_data["added_time"] = anime["added_time"]
+                    updated_data["completed_time"] = anime["completed_time"]
+                else:
+                    updated_data["completed_time"] = series["completed_time"]
 
-                if anime["score"]:
-                    if seriesed[anime["series"]].get("score_sum", None) != None:
-                        seriesed[anime["series"]]["score_sum"] += anime["score"]
-                        seriesed[anime["series"]]["score_count"] += 1
-                    else:
-                        seriesed[anime["series"]]["score_sum"] = anime["score"]
-                        seriesed[anime["series"]]["score_count"] = 1
-
-                seriesed[anime["series"]].update(updated_data)
-                seriesed[anime["series"]]["list"].append(anime)
-
-        for anime_series in seriesed:
-            if seriesed[anime_series].get("score_sum", None) != None:
-                if seriesed[anime_series]["status"] != "Заброшено":
-                    seriesed[anime_series]["score"] = round(
-                        seriesed[anime_series]["score_sum"]
-                        / seriesed[anime_series]["score_count"],
-                        1,
-                    )
-                del seriesed[anime_series]["score_sum"]
-                del seriesed[anime_series]["score_count"]
-
-        all_anime = [anime for anime in self.data.values() if not anime["series"]]
-
-        for series in seriesed.values():
-            series["list"] = sorted(
-                series["list"],
-                key=lambda anime: (
-                    self.status_mapping.get(anime["status"] or "", 4),
-                    int(
-                        (
-                            anime["completed_time"] or anime["added_time"] or UNIX_ZERO
-                        ).timestamp()
-                    ),
-                ),
-            )
-            all_anime.append(series)
-
-        self.sorted_list = jsonable_encoder(
-            sorted(
-                all_anime,
-                key=lambda anime: (
-                    self.status_mapping.get(anime["status"] or "", 4),
-                    -int((anime["completed_time"] or UNIX_ZERO).timestamp())
-                    or int((anime["added_time"] or UNIX_ZERO).timestamp()),
+            if series["status"] == anime["status"] == "Просмотрено":
+                if anime["completed_time"] > series["completed_time"]:
+                    updated_data["completed_time"] = anime["completed_time"]
+
+            if (anime["added_time"] or UNIX_ZERO) < (series["added_time"] or UNIX_ZERO):
+                updated_data["added_time"] = anime["added_time"]
+
+            if anime["score"]:
+                if series.get("score_sum", None) != None:
+                    series["score_sum"] += anime["score"]
+                    series["score_count"] += 1
+                else:
+                    series["score_sum"] = anime["score"]
+                    series["score_count"] = 1
+
+            series.update(updated_data)
+            series["list"].append(anime)
+
+        if series.get("score_sum", None) != None:
+            if series["status"] != "Заброшено":
+                series["score"] = round(series["score_sum"] / series["score_count"], 1)
+            del series["score_sum"]
+            del series["score_count"]
+
+        series["list"] = sorted(
+            series["list"],
+            key=lambda anime: (
+                self.status_mapping.get(anime["status"] or "", 4),
+                int(
+                    (
+                        anime["completed_time"] or anime["added_time"] or UNIX_ZERO
+                    ).timestamp()
                 ),
             ),
-            custom_encoder={
-                datetime: lambda datetime_obj: (datetime_obj.isoformat()).replace(
-                    "T", " "
-                )
-            },
         )
+        return series
+
+    def build_entry(self, entry_key: tuple) -> tuple | None:
+        kind, value = entry_key
+        if kind == "series":
+            if value not in self.series:
+                return None
+            entry = self.build_series(value)
+        else:
+            entry = self.data.get(value)
+            if entry == None or entry["series"]:
+                return None
+
+        sort_key = (
+            self.status_mapping.get(entry["status"] or "", 4),
+            -int((entry["completed_time"] or UNIX_ZERO).timestamp())
+            or int((entry["added_time"] or UNIX_ZERO).timestamp()),
+            entry_key,
+        )
+        fragment = dump_json(entry)
+        return sort_key, jsonable(entry), fragment
+
+    def publish(self) -> None:
+        for entry_key in self.changed_entries:
+            if entry_key in self.entries:
+                position = bisect_left(self.sorted_keys, self.entries.pop(entry_key))
+                del self.sorted_keys[position]
+                del self.sorted_list[position]
+                del self.fragments[position]
+
+            entry = self.build_entry(entry_key)
+            if entry == None:
+                continue
+            sort_key, encoded_entry, fragment = entry
+            position = bisect_left(self.sorted_keys, sort_key)
+            self.sorted_keys.insert(position, sort_key)
+            self.sorted_list.insert(position, encoded_entry)
+            self.fragments.insert(position, fragment)
+            self.entries[entry_key] = sort_key
+        self.changed_entries = set()
+
+        self.store_payload(b"[" + b",".join(self.fragments) + b"]")
+
+    def resort(self) -> None:
+        self.series = {}
+        self.positions = {}
+        entry_keys = set()
+        for position, anime in enumerate(self.data.values()):
+            self.positions[anime["id"]] = position
+            if anime["series"]:
+                if anime["series"] not in self.series:
+                    self.series[anime["series"]] = set()
+                self.series[anime["series"]].add(anime["id"])
+            entry_keys.add(self.entry_key(anime))
+        self.next_position = len(self.positions)
+
+        entries = sorted(
+            (self.build_entry(entry_key) for entry_key in entry_keys),
+            key=lambda entry: entry[0],
+        )
+        self.entries = {entry[0][-1]: entry[0] for entry in entries}
+        self.sorted_keys = [entry[0] for entry in entries]
+        self.sorted_list = [entry[1] for entry in entries]
+        self.fragments = [entry[2] for entry in entries]
+        self.changed_entries = set()
+
+        self.store_payload(b"[" + b",".join(self.fragments) + b"]")
 
     async def add(
         self, session: AsyncSession, elements: list[schema_anime.NewElement]
@@ -202,66 +275,50 @@ class AnimeData:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            inserted_elements_count = 0
             inserted_ids = []
+            new_elements = {}
             for element in elements:
                 if element.id == None:
                     self.non_mal_anime += 1
                     element.id = self.non_mal_anime
-                if element.id in self.data:
+                if element.id in self.data or element.id in new_elements:
                     inserted_ids.append(-1)
                     continue
-                additional_info = await self.get_anime_mal_info(element.id)
-                async with session.begin():
-                    dicted_element = element.model_dump()
-
-                    for key in ("link", "type", "episodes", "picture"):
-                        if not dicted_element[key]:
-                            dicted_element[key] = additional_info.get(key)
-
-                    dicted_element["added_time"] = (
-                        (dicted_element["added_time"] or datetime.now(timezone.utc))
-                        if dicted_element["added_time"] != UNIX_BELOW_ZERO
-                        else None
-                    )
-                    dicted_element["completed_time"] = (
-                        (dicted_element["completed_time"] or datetime.now(timezone.utc))
-                        if dicted_element["status"] in ("Просмотрено", "Заброшено")
-                        else None
-                    )
-
-                    new_anime = Anime(**dicted_element)
-                    session.add(new_anime)
-                    await session.flush()
-
-                    self.data[element.id] = dicted_element
+                dicted_element = element.model_dump()
+                dicted_element["added_time"] = (
+                    (dicted_element["added_time"] or datetime.now(timezone.utc))
+                    if dicted_element["added_time"] != UNIX_BELOW_ZERO
+                    else None
+                )
+                dicted_element["completed_time"] = (
+                    (dicted_element["completed_time"] or datetime.now(timezone.utc))
+                    if dicted_element["status"] in ("Просмотрено", "Заброшено")
+                    else None
+                )
 
-                    inserted_ids.append(element.id)
-                    inserted_elements_count += 1
-            if not inserted_elements_count:
+                new_elements[element.id] = get_row_dict(Anime, dicted_element)
+                inserted_ids.append(element.id)
+            if not new_elements:
                 HTTPabort(409, "Elements already exist")
-            self.resort()
+
+            async with session.begin():
+                await insert_rows(session, Anime, list(new_elements.values()))
+                await notify(session, self.name, list(new_elements))
+
+            for anime_id, dicted_element in new_elements.items():
+                self.data[anime_id] = dicted_element
+                self.link(dicted_element)
+            self.publish()
+            # mal link, type, episodes and picture are filled in background
+            self.enrich_later(list(new_elements))
             return inserted_ids
 
-    async def delete(
-        self, session: AsyncSession, elements: list[schema_anime.DeletedElement]
-    ) -> list[int]:
-        if not elements:
-            return HTTPabort(422, "Empty list")
-        async with self.lock:
-            delete_info = []
-            for element in elements:
-                if element.id not in self.data:
-                    delete_info.append(False)
-                    continue
-                async with session.begin():
-                    await session.execute(delete(Anime).where(Anime.id == element.id))
-                del self.data[element.id]
-                delete_info.append(True)
-            if True not in delete_info:
-                HTTPabort(404, "No elements to delete")
-            self.resort()
-            return delete_info
+    def forget(self, anime: dict) -> None:
+        self.unlink(anime, forget=True)
+
+    def remember(self, anime: dict) -> None:
+        self.non_mal_anime = max(self.non_mal_anime, anime["id"])
+        self.link(anime)
 
     async def update(
         self, session: AsyncSession, elements: list[schema_anime.UpdatedElement]
@@ -270,11 +327,20 @@ class AnimeData:
             return HTTPabort(422, "Empty list")
         async with self.lock:
             update_info = []
+            # ids changed by previous elements of this request
+            staged = {}
+            id_changes = []
+            updated_elements = {}
             for element in elements:
-                if element.id not in self.data:
+                anime = staged.get(element.id, self.data.get(element.id))
+                if anime == None:
                     update_info.append("No element")
                     continue
-                if element.new_id in self.data:
+                if (
+                    element.new_id != None
+                    and staged.get(element.new_id, self.data.get(element.new_id))
+                    != None
+                ):
                     update_info.append("Can't update id to existed anime")
                     continue
 
@@ -287,13 +353,9 @@ class AnimeData:
                     if element.new_id == -1:
                         self.non_mal_anime += 1
                         new_id = self.non_mal_anime
-                    async with session.begin():
-                        await session.execute(
-                            update(Anime)
-                            .where(Anime.id == element.id)
-                            .values(id=new_id)
-                        )
-                    self.data[new_id] = self.data.pop(element.id)
+                    id_changes.append((element.id, new_id))
+                    staged[element.id] = None
+                    staged[new_id] = anime
                     element.id = new_id
                     dicted_element["id"] = new_id
                     dicted_element.update(await self.get_anime_mal_info(element.id))
@@ -318,116 +380,112 @@ class AnimeData:
                 for key, value in dicted_element.items():
                     if value == "":
                         dicted_element[key] = None
-                async with session.begin():
-                    await session.execute(
-                        update(Anime)
-                        .where(Anime.id == element.id)
-                        .values(dicted_element)
-                    )
-                self.data[element.id].update(dicted_element)
+
+                _, values = updated_elements.setdefault(id(anime), (anime, {}))
+                values.update(dicted_element)
                 update_info.append("Updated")
             if "Updated" not in update_info:
                 HTTPabort(404, "No elements to update")
-            self.resort()
-            return update_info
-
-    async def get_all(self, raw: bool) -> list:
-        if raw:
-            async with self.lock:
-                result = []
-                for item in self.data.values():
-                    item_record = {}
-                    for tag in (
-                        "id",
-                        "series",
-                        "name",
-                        "order_by",
-                        "voice_acting",
-                        "status",
-                        "comment",
-                        "score",
-                        "added_time",
-                        "completed_time",
-                        "picture_mode",
-                    ):
-                        if tag == "id" and item[tag] >= self.non_mal_border:
-                            for t in ("link", "picture", "type", "episodes"):
-                                item_record[t] = item[t]
-                        if tag == "picture_mode" and item[tag] == "portrait":
-                            continue
-                        item_record[tag] = item[tag]
-                    result.append(item_record)
-
-                return jsonable_encoder(
-                    result,
-                    custom_encoder={
-                        datetime: lambda datetime_obj: (
-                            datetime_obj.isoformat()
-                        ).replace("T", " "),
-                        ddate: lambda date_obj: (date_obj.isoformat()),
-                        dtime: lambda time_obj: (time_obj.isoformat()),
-                    },
-                )
-        return self.sorted_list
 
-    async def get_customers(self) -> list:
-        async with self.lock:
-            result = {"all": len(self.data), "people": {}}
-            by_customers = {}
-            for anime in self.data.values():
-                customers = (anime["order_by"] or cfg.STREAMER).split("+")
-                for customer in customers:
-                    if customer not in by_customers:
-                        by_customers[customer] = {
-                            "list": [],
-                            "count": 0,
-                        }
-                    status = f"({anime['status']})" if anime["status"] else ""
-                    by_customers[customer]["list"].append(
-                        (f"{anime['series'] or ''} {anime['name']} {status}").strip()
+            async with session.begin():
+                for old_id, new_id in id_changes:
+                    await session.execute(
+                        update(Anime).where(Anime.id == old_id).values(id=new_id)
                     )
-                    by_customers[customer]["count"] += 1
-            for customer, info in by_customers.items():
-                by_customers[customer]["list"] = sorted(
-                    info["list"], key=lambda anime: anime.lower()
+                rows = [
+                    {**values, "id": values.get("id", anime["id"])}
+                    for anime, values in updated_elements.values()
+                ]
+                await update_rows(session, Anime, rows)
+                await notify(
+                    session,
+                    self.name,
+                    [
+                        *(old_id for old_id, _ in id_changes),
+                        *(row["id"] for row in rows),
+                    ],
                 )
-            result["people"] = by_customers
-            return result
 
-    async def update_pictures(
-        self, session: AsyncSession, anime_list: list[int]
-    ) -> dict[int, str]:
-        result = {}
-        async with self.lock:
-            for anime_id in self.data:
-                if anime_list and anime_id not in anime_list:
-                    result[anime_id] = "Not found"
-                    continue
+            for anime, values in updated_elements.values():
+                new_id = values.get("id", anime["id"])
+                if new_id != anime["id"] or (
+                    values.get("series", anime["series"]) != anime["series"]
+                ):
+                    self.unlink(anime, forget=new_id != anime["id"])
+                if new_id != anime["id"]:
+                    self.data[new_id] = self.data.pop(anime["id"])
+                anime.update(values)
+                self.link(anime)
+            self.publish()
+            return update_info
 
-                if anime_id > self.non_mal_border or (
-                    self.data[anime_id]["picture"] or ""
-                ).startswith("/static"):
-                    continue
+    def search_entry(self, anime: dict) -> tuple[list[tuple[str, int]], dict]:
+        fields = [
+            (anime["name"], 3),
+            (anime["series"] or "", 2),
+            (anime["comment"] or "", 1),
+        ]
+        return fields, {
+            "title": anime["name"],
+            "subtitle": anime["series"],
+            "status": anime["status"],
+        }
 
-                new_mal_picture = (await self.get_anime_mal_info(anime_id)).get(
-                    "picture"
-                )
-                if not new_mal_picture:
-                    result[anime_id] = "No MAL picture"
-                    continue
+    def raw_record(self, anime: dict) -> dict:
+        item_record = super().raw_record(anime)
+        if anime["id"] >= self.non_mal_border:
+            item_record = {
+                **{tag: anime[tag] for tag in ("link", "picture", "type", "episodes")},
+                **item_record,
+            }
+        if anime["picture_mode"] == "portrait":
+            del item_record["picture_mode"]
+        return item_record
 
-                if new_mal_picture != self.data[anime_id]["picture"]:
-                    async with session.begin():
-                        await session.execute(
-                            update(Anime)
-                            .where(Anime.id == anime_id)
-                            .values(picture=new_mal_picture)
-                        )
-                        self.data[anime_id]["picture"] = new_mal_picture
-                        result[anime_id] = "Updated"
-                else:
-                    if anime_list:
-                        result[anime_id] = "Not updated"
+    def get_listing(
+        self, fields: list[str], limit: int | None, cursor: str | None
+    ) -> list | dict:
+        if limit == None:
+            return self.project(self.sorted_list, fields)
+        return self.get_page(self.sorted_keys, self.sorted_list, limit, cursor, fields)
 
-        self.resort()
+    async def get_customers(self) -> list:
+        result = {"all": len(self.data), "people": {}}
+        by_customers = {}
+        for anime in self.data.values():
+            customers = (anime["order_by"] or cfg.STREAMER).split("+")
+            for customer in customers:
+                if customer not in by_customers:
+                    by_customers[customer] = {
+                        "list": [],
+                        "count": 0,
+                    }
+                status = f"({anime['status']})" if anime["status"] else ""
+                by_customers[customer]["list"].append(
+                    (f"{anime['series'] or ''} {anime['name']} {status}").strip()
+                )
+                by_customers[customer]["count"] += 1
+        for customer, info in by_customers.items():
+            by_customers[customer]["list"] = sorted(
+                info["list"], key=lambda anime: anime.lower()
+            )
+        result["people"] = by_customers
         return result
+
+    def has_external_picture(self, anime: dict) -> bool:
+        return anime["id"] < self.non_mal_border and not (
+            anime["picture"] or ""
+        ).startswith("/static")
+
+    def can_enrich(self, anime: dict) -> bool:
+        return anime["id"] < self.non_mal_border
+
+    async def fetch_info(self, anime_id: int) -> dict:
+        if anime_id >= self.non_mal_border:
+            return {}
+        return await self.get_anime_mal_info(anime_id)
+
+    def patch(self, anime: dict, values: dict) -> None:
+        self.unlink(anime)
+        anime.update(values)
+        self.link(anime)
@@ -3,10 +3,11 @@ from typing import Any
 
 from common.config import cfg
 from common.errors import HTTPabort
-from db.common import get_model_dict
+from db.common import get_model_dict, insert_rows
 from db.models import SCHEMA, DataParams
+from db.notify import notify
 from schemas import data_params as schema_data_params
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
 
@@ -26,7 +27,10 @@ class DataParamsData:
     def __init__(self) -> None:
         self.raw_data = {}
         self.data = {}
+        # replaced after every change, read without lock
+        self.raw_list = []
         self.lock = asyncio.Lock()
+        self.name = ""
 
     def get_value(self, row_dict: dict[str, Any]) -> Any:
         for key, value in row_dict.items():
@@ -43,15 +47,32 @@ class DataParamsData:
                 self.raw_data[row.name] = get_model_dict(row)
                 self.data[row.name] = self.get_value(self.raw_data[row.name])
 
-            for name, value in self.DEFAULTS.items():
-                if name not in db_names:
-                    row = {"name": name, **value}
-                    await session.execute(insert(DataParams).values(row))
-                    self.raw_data[name] = row
-                    self.data[name] = self.get_value(row)
+            rows = [
+                {"name": name, **value}
+                for name, value in self.DEFAULTS.items()
+                if name not in db_names
+            ]
+            await insert_rows(session, DataParams, rows)
+            for row in rows:
+                self.raw_data[row["name"]] = row
+                self.data[row["name"]] = self.get_value(row)
+        self.publish()
 
         cfg.logger.info("Data Params info was loaded to memory")
 
+    async def reload(self, session: AsyncSession, names: list[str] | None) -> None:
+        async with self.lock:
+            async with session.begin():
+                db_data = await session.scalars(select(DataParams))
+                self.raw_data = {row.name: get_model_dict(row) for row in db_data}
+            self.data = {
+                name: self.get_value(row) for name, row in self.raw_data.items()
+            }
+            self.publish()
+
+    def publish(self) -> None:
+        self.raw_list = list(self.raw_data.values())
+
     async def reset(self, session: AsyncSession) -> None:
         async with self.lock:
             async with session.begin():
@@ -60,13 +81,17 @@ class DataParamsData:
                         f"TRUNCATE TABLE {SCHEMA}.{DataParams.__table__.name} RESTART IDENTITY;"
                     )
                 )
+                rows = [
+                    {"name": name, **value} for name, value in self.DEFAULTS.items()
+                ]
+                await insert_rows(session, DataParams, rows)
+                await notify(session, self.name)
             self.raw_data = {}
             self.data = {}
-            for name, value in self.DEFAULTS.items():
-                row = {"name": name, **value}
-                await session.execute(insert(DataParams).values(row))
-                self.raw_data[name] = row
-                self.data[name] = self.get_value(row)
+            for row in rows:
+                self.raw_data[row["name"]] = row
+                self.data[row["name"]] = self.get_value(row)
+            self.publish()
 
     async def add(
         self, session: AsyncSession, elements: list[schema_data_params.Element]
@@ -74,26 +99,28 @@ class DataParamsData:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            inserted_elements_count = 0
             inserted_ids = []
+            new_elements = {}
             for element in elements:
-                if element.name in self.data:
+                if element.name in self.data or element.name in new_elements:
                     inserted_ids.append(-1)
                     continue
+                inserted_ids.append(len(new_elements))
+                new_elements[element.name] = element.model_dump()
+            if not new_elements:
+                HTTPabort(409, "Elements already exist")
 
-                dicted_element = element.model_dump()
-                async with session.begin():
-                    inserted_element = await session.scalar(
-                        insert(DataParams).values(dicted_element).returning(DataParams)
-                    )
-                    self.raw_data[element.name] = dicted_element
-                    self.data[element.name] = self.get_value(dicted_element)
+            async with session.begin():
+                new_ids = await insert_rows(
+                    session, DataParams, list(new_elements.values())
+                )
+                await notify(session, self.name)
 
-                    inserted_ids.append(inserted_element.id)
-                    inserted_elements_count += 1
-            if not inserted_elements_count:
-                HTTPabort(409, "Elements already exist")
-            return inserted_ids
+            for name, dicted_element in new_elements.items():
+                self.raw_data[name] = dicted_element
+                self.data[name] = self.get_value(dicted_element)
+            self.publish()
+            return [new_ids[index] if index != -1 else -1 for index in inserted_ids]
 
     async def update(
         self, session: AsyncSession, elements: list[schema_data_params.Element]
@@ -102,24 +129,31 @@ class DataParamsData:
             return HTTPabort(422, "Empty list")
         async with self.lock:
             update_info = []
+            updated_elements = []
             for element in elements:
                 if element.name not in self.data:
                     update_info.append("No element")
                     continue
-
-                dicted_element = element.model_dump()
-                async with session.begin():
-                    await session.execute(
-                        update(DataParams)
-                        .where(DataParams.name == element.name)
-                        .values(dicted_element)
-                    )
-                    self.raw_data[element.name] = dicted_element
-                    self.data[element.name] = self.get_value(dicted_element)
-
-                    update_info.append("Updated")
+                updated_elements.append(element.model_dump())
+                update_info.append("Updated")
             if "Updated" not in update_info:
                 HTTPabort(404, "No elements to update")
+
+            table = DataParams.__table__
+            async with session.begin():
+                await session.execute(
+                    update(table).where(table.c.name == bindparam("param_name")),
+                    [
+                        {"param_name": dicted_element["name"], **dicted_element}
+                        for dicted_element in updated_elements
+                    ],
+                )
+                await notify(session, self.name)
+
+            for dicted_element in updated_elements:
+                self.raw_data[dicted_element["name"]] = dicted_element
+                self.data[dicted_element["name"]] = self.get_value(dicted_element)
+            self.publish()
             return update_info
 
     async def delete(
@@ -129,27 +163,33 @@ class DataParamsData:
             return HTTPabort(422, "Empty list")
         async with self.lock:
             delete_info = []
+            names_for_delete = []
             for element in elements:
-                if element.name not in self.data:
+                if element.name not in self.data or element.name in names_for_delete:
                     delete_info.append("False")
                     continue
                 if element.name in self.DEFAULTS:
                     delete_info.append("Can't remove params used in code")
                     continue
-
-                async with session.begin():
-                    await session.execute(
-                        delete(DataParams).where(DataParams.name == element.name)
-                    )
-                    del self.data[element.name]
-                    del self.raw_data[element.name]
-
-                    delete_info.append("True")
+                names_for_delete.append(element.name)
+                delete_info.append("True")
             if "True" not in delete_info:
                 if "Can't remove params used in code" not in delete_info:
                     HTTPabort(404, "No elements to delete")
                 if "False" not in delete_info:
                     HTTPabort(404, "Can't remove params used in code")
+
+            if names_for_delete:
+                async with session.begin():
+                    await session.execute(
+                        delete(DataParams).where(DataParams.name.in_(names_for_delete))
+                    )
+                    await notify(session, self.name)
+
+            for name in names_for_delete:
+                del self.data[name]
+                del self.raw_data[name]
+            self.publish()
             return delete_info
 
     def get(self, name: str) -> Any:
@@ -158,5 +198,4 @@ class DataParamsData:
         return self.data.get(name)
 
     async def get_all(self, raw=False) -> list[dict[str, Any]]:
-        async with self.lock:
-            return [row for row in self.raw_data.values()]
+        return self.raw_list
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from common.config import cfg
+from common.http_client import get_http_client
+from db.common import delete_rows, get_engine, get_model_dict, insert_rows, update_rows
+from db.models import DiscordOutbox
+from db.notify import is_leader, notify
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class DiscordOutboxData:
+    # discord limits for one message
+    MAX_EMBEDS = 10
+    MAX_EMBEDS_SIZE = 6000
+    MAX_ATTEMPTS = 10
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.blocked_until = {}
+        self.lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.name = ""
+
+    def hook_url(self, hook: str) -> str:
+        return {
+            "timecode": cfg.DISCORD_HOOK_TIMECODE,
+            "site_messages": cfg.DISCORD_HOOK_SITE_MESSAGES,
+        }[hook]
+
+    async def setup(self, session: AsyncSession) -> None:
+        async with session.begin():
+            db_data = await session.scalars(
+                select(DiscordOutbox).order_by(DiscordOutbox.id)
+            )
+            self.data = {row.id: get_model_dict(row) for row in db_data}
+        if self.task == None:
+            self.task = asyncio.create_task(self.worker())
+        cfg.logger.info("Discord outbox was loaded to memory")
+
+    async def reload(self, session: AsyncSession, ids: list[int] | None) -> None:
+        async with self.lock:
+            async with session.begin():
+                db_data = await session.scalars(
+                    select(DiscordOutbox).order_by(DiscordOutbox.id)
+                )
+                self.data = {row.id: get_model_dict(row) for row in db_data}
+        self.wakeup.set()
+
+    async def stop(self) -> None:
+        if self.task != None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def add(self, session: AsyncSession, hook: str, embed: dict) -> None:
+        now = datetime.now(timezone.utc)
+        message = {
+            "hook": hook,
+            "embed": embed,
+            "attempts": 0,
+            "created": now,
+            # short delay lets bursts be sent as one message
+            "next_try": now + timedelta(seconds=cfg.DISCORD_BATCH_DELAY),
+        }
+        async with self.lock:
+            async with session.begin():
+                (message["id"],) = await insert_rows(session, DiscordOutbox, [message])
+                await notify(session, self.name)
+            self.data[message["id"]] = message
+        self.wakeup.set()
+
+    async def worker(self) -> None:
+        while True:
+            self.wakeup.clear()
+            try:
+                delay = await self.send_due()
+            except Exception as e:
+                cfg.logger.error(f"Error sending discord messages: {e}")
+                delay = 5
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def next_batch(self, hook: str) -> list[dict]:
+        batch = []
+        size = 0
+        for message in self.data.values():
+            if message["hook"] != hook:
+                continue
+            # messages waiting for retry are not taken before their time
+            if batch and message["attempts"]:
+                break
+            embed_size = len(json.dumps(message["embed"], ensure_ascii=False))
+            if batch and (
+                len(batch) == self.MAX_EMBEDS
+                or size + embed_size > self.MAX_EMBEDS_SIZE
+            ):
+                break
+            batch.append(message)
+            size += embed_size
+        return batch
+
+    async def send_due(self) -> float | None:
+        if not is_leader():
+            # only one worker sends messages, others check for leadership later
+            return 30
+        now = datetime.now(timezone.utc)
+        waits = []
+        for hook in {message["hook"] for message in self.data.values()}:
+            batch = self.next_batch(hook)
+            ready_at = max(
+                batch[0]["next_try"], self.blocked_until.get(hook, batch[0]["next_try"])
+            )
+            if ready_at <= now:
+                await self.send(hook, batch)
+                # next batch of this hook is checked on the next loop
+                waits.append(0)
+            else:
+                waits.append((ready_at - now).total_seconds())
+        return min(waits) if waits else None
+
+    async def send(self, hook: str, batch: list[dict]) -> None:
+        delay = 0
+        try:
+            response = await get_http_client().post(
+                self.hook_url(hook),
+                json={"embeds": [message["embed"] for message in batch]},
+            )
+            delay = self.rate_limit_delay(response)
+            sent = 200 <= response.status_code < 300
+            if response.status_code == 429:
+                cfg.logger.warning(f"Discord {hook} hook is rate limited for {delay}s")
+                self.blocked_until[hook] = datetime.now(timezone.utc) + timedelta(
+                    seconds=delay
+                )
+                return
+            if not sent:
+                cfg.logger.error(
+                    f"Failed to send {hook} to discord (code {response.status_code})"
+                )
+                cfg.logger.error(response.content)
+        except httpx.HTTPError as e:
+            sent = False
+            cfg.logger.error(f"Failed to send {hook} to discord: {e}")
+
+        if delay:
+            # bucket is empty, next request would get 429
+            self.blocked_until[hook] = datetime.now(timezone.utc) + timedelta(
+                seconds=delay
+            )
+        if sent:
+            await self.remove(batch)
+        else:
+            await self.postpone(batch)
+
+    def rate_limit_delay(self, response: httpx.Response) -> float:
+        if response.status_code == 429:
+            try:
+                return float(response.json()["retry_after"])
+            except Exception:
+                return float(response.headers.get("Retry-After", 1))
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            return float(response.headers.get("X-RateLimit-Reset-After", 0))
+        return 0
+
+    async def remove(self, batch: list[dict]) -> None:
+        async with self.lock:
+            async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+                async with session.begin():
+                    await delete_rows(
+                        session, DiscordOutbox, [message["id"] for message in batch]
+                    )
+                    await notify(session, self.name)
+            for message in batch:
+                self.data.pop(message["id"], None)
+
+    async def postpone(self, batch: list[dict]) -> None:
+        now = datetime.now(timezone.utc)
+        expired = []
+        rows = []
+        for message in batch:
+            if message["attempts"] + 1 >= self.MAX_ATTEMPTS:
+                cfg.logger.error(f"Discord message dropped: {message['embed']}")
+                expired.append(message)
+                continue
+            # exponential backoff with jitter
+            delay = min(2 ** message["attempts"], 300) * random.uniform(0.5, 1)
+            rows.append(
+                {
+                    "id": message["id"],
+                    "attempts": message["attempts"] + 1,
+                    "next_try": now + timedelta(seconds=delay),
+                }
+            )
+        if expired:
+            await self.remove(expired)
+        async with self.lock:
+            async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+                async with session.begin():
+                    await update_rows(session, DiscordOutbox, rows)
+                    await notify(session, self.name)
+            for row in rows:
+                if row["id"] in self.data:
+                    self.data[row["id"]].update(row)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from common.config import cfg
+from db.common import get_engine
+from db.models import SCHEMA, ExternalInfo
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
+
+# loader returns info and if it may be cached (False on network errors)
+Loader = Callable[[int], Awaitable[tuple[dict, bool]]]
+
+
+class ExternalData:
+    def __init__(self) -> None:
+        self.data = {}
+        self.lock = asyncio.Lock()
+
+    async def setup(self, session: AsyncSession) -> None:
+        async with session.begin():
+            db_data = await session.scalars(select(ExternalInfo))
+            self.data = {
+                (row.provider, row.external_id): {
+                    "info": row.info,
+                    "fetched": row.fetched,
+                }
+                for row in db_data
+            }
+        cfg.logger.info("External info was loaded to memory")
+
+    async def reset(self, session: AsyncSession) -> None:
+        async with self.lock:
+            async with session.begin():
+                await session.execute(
+                    text(f"TRUNCATE TABLE {SCHEMA}.{ExternalInfo.__table__.name};")
+                )
+            self.data = {}
+
+    def get_cached(self, provider: str, external_id: int) -> dict | None:
+        cached = self.data.get((provider, external_id))
+        if cached == None:
+            return None
+        # entries without picture are misses and expire sooner
+        ttl = (
+            cfg.EXTERNAL_TTL if cached["info"].get("picture") else cfg.EXTERNAL_MISS_TTL
+        )
+        if cached["fetched"] + timedelta(seconds=ttl) < datetime.now(timezone.utc):
+            return None
+        return cached["info"]
+
+    async def store(self, provider: str, external_id: int, info: dict) -> None:
+        fetched = datetime.now(timezone.utc)
+        self.data[(provider, external_id)] = {"info": info, "fetched": fetched}
+        try:
+            async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+                async with session.begin():
+                    await session.merge(
+                        ExternalInfo(
+                            provider=provider,
+                            external_id=external_id,
+                            info=info,
+                            fetched=fetched,
+                        )
+                    )
+        except Exception as e:
+            cfg.logger.warning(
+                f"Error saving {provider} {external_id} external info - {e}"
+            )
+
+    async def get(self, provider: str, external_id: int, loader: Loader) -> dict:
+        info = self.get_cached(provider, external_id)
+        if info != None:
+            return dict(info)
+
+        info, cacheable = await loader(external_id)
+        if cacheable:
+            await self.store(provider, external_id, info)
+        return dict(info)
+
+
+external_data = ExternalData()
@@ -1,57 +1,169 @@
-import asyncio
-from datetime import date as ddate
-from datetime import datetime
-from datetime import time as dtime
+import heapq
+from bisect import bisect_left, insort
 
-import httpx
-from common.config import cfg
 from common.errors import HTTPabort
-from db.common import get_model_dict
-from db.models import SCHEMA, Games
-from fastapi.encoders import jsonable_encoder
+from common.search import TextIndex
+from common.steam import get_steam_info
+from common.utils import dump_json, dump_json_dict, wrap_content
+from crud._base import BaseData
+from crud.external import external_data
+from db.common import get_row_dict, insert_rows, update_rows
+from db.models import Games
+from db.notify import notify
 from schemas import games as schema_games
-from sqlalchemy import delete, select, update
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import text
 
 
-class GamesData:
+class GamesData(BaseData):
+    model = Games
+    title = "Games"
+    search_type = "games"
+    picture_source = "Steam"
+    enrich_fields = ("link", "picture")
+    raw_tags = (
+        "id",
+        "name",
+        "subname",
+        "link",
+        "picture",
+        "picture_mode",
+        "status",
+        "genre",
+        "type",
+        "records",
+        "comment",
+        "gift_by",
+        "order_by",
+    )
+
     def __init__(self) -> None:
-        self.data = {}
+        super().__init__()
         self.lists = {}
+        self.keys = {}
+        self.fragments = {}
+        self.changed_types = set()
+        self.payloads = {}
         self.genres = {}
-        self.lock = asyncio.Lock()
+        self.genre_counts = {}
+        self.search_index = TextIndex()
 
         self.non_steam_border = 1000 * 1000 * 1000 * 1000
         self.non_steam_game = 1000 * 1000 * 1000 * 1000
 
-    async def setup(self, session: AsyncSession) -> None:
-        async with session.begin():
-            db_data = await session.scalars(select(Games))
-            for row in db_data:
-                if row.id > self.non_steam_border and row.id > self.non_steam_game:
-                    self.non_steam_game = row.id
-                self.data[row.id] = get_model_dict(row)
-        self.resort()
-        cfg.logger.info("Games info was loaded to memory")
-
-    async def reset(self, session: AsyncSession) -> None:
-        async with self.lock:
-            async with session.begin():
-                await session.execute(
-                    text(
-                        f"TRUNCATE TABLE {SCHEMA}.{Games.__table__.name} RESTART IDENTITY;"
-                    )
+    def rebuild(self) -> None:
+        self.non_steam_game = max([self.non_steam_border, *self.data])
+        super().rebuild()
+
+    def sort_key(self, game: dict) -> tuple:
+        return (
+            (game["subname"] or game["name"]).lower(),
+            game["name"].lower(),
+            game["id"],
+        )
+
+    def index(self, game: dict) -> None:
+        game_type = game["type"] or "main"
+        if game_type not in self.lists:
+            self.lists[game_type] = []
+            self.keys[game_type] = []
+            self.fragments[game_type] = []
+            self.genre_counts[game_type] = {}
+            self.genres[game_type] = []
+
+        if game["records"]:
+            game["records"] = sorted(
+                game["records"], key=lambda record: record.get("order", 1)
+            )
+
+        key = self.sort_key(game)
+        position = bisect_left(self.keys[game_type], key)
+        self.keys[game_type].insert(position, key)
+        self.lists[game_type].insert(position, game)
+        self.fragments[game_type].insert(position, dump_json(game))
+
+        genre_counts = self.genre_counts[game_type]
+        genre_counts[game["genre"]] = genre_counts.get(game["genre"], 0) + 1
+        if genre_counts[game["genre"]] == 1:
+            insort(self.genres[game_type], game["genre"])
+
+        self.search_index.add(
+            game["id"], self.search_text(game), self.search_tags(game)
+        )
+        self.mark_changed([game["id"]])
+        self.changed_types.add(game_type)
+
+    def unindex(self, game: dict) -> None:
+        game_type = game["type"] or "main"
+
+        position = bisect_left(self.keys[game_type], self.sort_key(game))
+        del self.keys[game_type][position]
+        del self.lists[game_type][position]
+        del self.fragments[game_type][position]
+
+        genre_counts = self.genre_counts[game_type]
+        genre_counts[game["genre"]] -= 1
+        if not genre_counts[game["genre"]]:
+            del genre_counts[game["genre"]]
+            self.genres[game_type].remove(game["genre"])
+
+        self.search_index.remove(game["id"])
+        self.mark_changed([game["id"]])
+        self.changed_types.add(game_type)
+
+    def search_text(self, game: dict) -> str:
+        return f"{game['name']} {game['subname'] or ''}"
+
+    def search_tags(self, game: dict) -> list[tuple[str, str]]:
+        tags = [
+            ("genre", game["genre"]),
+            ("status", game["status"]),
+            ("type", game["type"] or "main"),
+        ]
+        for field in ("gift_by", "order_by"):
+            for customer in (game[field] or "").split("+"):
+                tags.append((field, customer))
+        return tags
+
+    def search_entry(self, game: dict) -> tuple[list[tuple[str, int]], dict]:
+        fields = [
+            (game["name"], 3),
+            (game["subname"] or "", 2),
+            (game["genre"] or "", 1),
+            (game["comment"] or "", 1),
+        ]
+        return fields, {
+            "title": game["name"],
+            "subtitle": game["subname"],
+            "status": game["status"],
+        }
+
+    def publish(self) -> None:
+        for game_type in self.changed_types:
+            if self.lists[game_type]:
+                self.payloads[game_type] = (
+                    b"[" + b",".join(self.fragments[game_type]) + b"]"
                 )
-            self.data = {}
-            self.lists = {}
-            self.genres = {}
-            self.non_steam_game = self.non_steam_border
+                continue
+            for index in (
+                self.lists,
+                self.keys,
+                self.fragments,
+                self.genre_counts,
+                self.genres,
+                self.payloads,
+            ):
+                index.pop(game_type, None)
+        self.changed_types = set()
+        # types in the same order as in self.lists
+        self.payloads = {
+            game_type: self.payloads[game_type] for game_type in self.lists
+        }
+
+        self.store_payload(dump_json_dict(self.payloads))
 
     def resort(self) -> None:
         typed_games = {}
-        typed_genres = {}
-
         for game in self.data.values():
             game_type = game["type"] or "main"
             if game_type not in typed_games:
@@ -61,50 +173,38 @@ class GamesData:
                 game["records"] = sorted(
                     game["records"], key=lambda record: record.get("order", 1)
                 )
-            typed_games[game_type].append(game)
+            typed_games[game_type].append((self.sort_key(game), game))
 
-            if game_type not in typed_genres:
-                typed_genres[game_type] = set()
-            typed_genres[game_type].add(game["genre"])
-
-        for game_type, games in typed_games.items():
-            typed_games[game_type] = sorted(
-                games,
-                key=lambda game: (
-                    (game["subname"] or game["name"]).lower(),
-                    game["name"].lower(),
-                ),
+        self.lists = {}
+        self.keys = {}
+        self.fragments = {}
+        self.genre_counts = {}
+        self.genres = {}
+        self.payloads = {}
+        self.search_index = TextIndex()
+        for game in self.data.values():
+            self.search_index.add(
+                game["id"], self.search_text(game), self.search_tags(game)
             )
+        for game_type, games in typed_games.items():
+            games.sort(key=lambda item: item[0])
+            self.keys[game_type] = [key for key, _ in games]
+            self.lists[game_type] = [game for _, game in games]
+            self.fragments[game_type] = [dump_json(game) for _, game in games]
 
-        for game_type, genres in typed_genres.items():
-            typed_genres[game_type] = sorted(genres)
+            genre_counts = {}
+            for _, game in games:
+                genre_counts[game["genre"]] = genre_counts.get(game["genre"], 0) + 1
+            self.genre_counts[game_type] = genre_counts
+            self.genres[game_type] = sorted(genre_counts)
 
-        self.lists = typed_games
-        self.genres = typed_genres
+            self.changed_types.add(game_type)
+        self.publish()
 
     async def check_steam(self, steam_id: int) -> dict:
-        result = {}
         if steam_id < self.non_steam_border:
-            result["link"] = f"https://store.steampowered.com/app/{steam_id}"
-            try:
-                templates = [
-                    f"https://cdn.akamai.steamstatic.com/steam/apps/{steam_id}/capsule_616x353.jpg",
-                    f"https://cdn.akamai.steamstatic.com/steam/apps/{steam_id}/header.jpg",
-                    f"https://cdn.cloudflare.steamstatic.com/steam/apps/{steam_id}/header.jpg",
-                    f"https://shared.akamai.steamstatic.com/store_item_assets/steam/apps/{steam_id}/header.jpg",
-                    f"https://shared.cloudflare.steamstatic.com/store_item_assets/steam/apps/{steam_id}/header.jpg",
-                ]
-                for template in templates:
-                    async with httpx.AsyncClient() as ac:
-                        response = await ac.get(template)
-                        if response.status_code == 200:
-                            result["picture"] = template
-                            break
-                if not result.get("picture"):
-                    cfg.logger.warning(f"No valid pic for steam-game {steam_id}")
-            except Exception:
-                cfg.logger.warning(f"Error getting steam-game {steam_id} pic")
-        return result
+            return await external_data.get("steam", steam_id, get_steam_info)
+        return {}
 
     async def add(
         self, session: AsyncSession, elements: list[schema_games.NewElement]
@@ -112,57 +212,39 @@ class GamesData:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            inserted_elements_count = 0
             inserted_ids = []
+            new_elements = {}
             for element in elements:
                 if element.id == None:
                     self.non_steam_game += 1
                     element.id = self.non_steam_game
-                if element.id in self.data:
+                if element.id in self.data or element.id in new_elements:
                     inserted_ids.append(-1)
                     continue
 
-                additional_info = await self.check_steam(element.id)
-                async with session.begin():
-                    dicted_element = element.model_dump()
-
-                    if not dicted_element["link"]:
-                        dicted_element["link"] = additional_info.get("link")
-                    if not dicted_element["picture"]:
-                        dicted_element["picture"] = additional_info.get("picture")
-
-                    new_game = Games(**dicted_element)
-                    session.add(new_game)
-                    await session.flush()
-
-                    self.data[element.id] = dicted_element
-
-                    inserted_ids.append(element.id)
-                    inserted_elements_count += 1
-            if not inserted_elements_count:
+                new_elements[element.id] = get_row_dict(Games, element.model_dump())
+                inserted_ids.append(element.id)
+            if not new_elements:
                 HTTPabort(409, "Elements already exist")
-            self.resort()
+
+            async with session.begin():
+                await insert_rows(session, Games, list(new_elements.values()))
+                await notify(session, self.name, list(new_elements))
+
+            for game_id, dicted_element in new_elements.items():
+                self.data[game_id] = dicted_element
+                self.index(dicted_element)
+            self.publish()
+            # steam link and picture are filled in background
+            self.enrich_later(list(new_elements))
             return inserted_ids
 
-    async def delete(
-        self, session: AsyncSession, elements: list[schema_games.DeletedElement]
-    ) -> list[int]:
-        if not elements:
-            return HTTPabort(422, "Empty list")
-        async with self.lock:
-            delete_info = []
-            for element in elements:
-                if element.id not in self.data:
-                    delete_info.append(False)
-                    continue
-                async with session.begin():
-                    await session.execute(delete(Games).where(Games.id == element.id))
-                del self.data[element.id]
-                delete_info.append(True)
-            if True not in delete_info:
-                HTTPabort(404, "No elements to delete")
-            self.resort()
-            return delete_info
+    def forget(self, game: dict) -> None:
+        self.unindex(game)
+
+    def remember(self, game: dict) -> None:
+        self.non_steam_game = max(self.non_steam_game, game["id"])
+        self.index(game)
 
     async def update(
         self, session: AsyncSession, elements: list[schema_games.UpdatedElement]
@@ -171,11 +253,20 @@ class GamesData:
             return HTTPabort(422, "Empty list")
         async with self.lock:
             update_info = []
+            # ids changed by previous elements of this request
+            staged = {}
+            id_changes = []
+            updated_elements = {}
             for element in elements:
-                if element.id not in self.data:
+                game = staged.get(element.id, self.data.get(element.id))
+                if game == None:
                     update_info.append("No element")
                     continue
-                if element.new_id in self.data:
+                if (
+                    element.new_id != None
+                    and staged.get(element.new_id, self.data.get(element.new_id))
+                    != None
+                ):
                     update_info.append("Can't update id to existed game")
                     continue
 
@@ -188,13 +279,9 @@ class GamesData:
                     if element.new_id == -1:
                         self.non_steam_game += 1
                         new_id = self.non_steam_game
-                    async with session.begin():
-                        await session.execute(
-                            update(Games)
-                            .where(Games.id == element.id)
-                            .values(id=new_id)
-                        )
-                    self.data[new_id] = self.data.pop(element.id)
+                    id_changes.append((element.id, new_id))
+                    staged[element.id] = None
+                    staged[new_id] = game
                     element.id = new_id
                     dicted_element["id"] = new_id
                     dicted_element.update(await self.check_steam(element.id))
@@ -203,65 +290,55 @@ class GamesData:
                     if value in ("", []):
                         dicted_element[key] = None
 
-                async with session.begin():
-                    await session.execute(
-                        update(Games)
-                        .where(Games.id == element.id)
-                        .values(dicted_element)
-                    )
-                self.data[element.id].update(dicted_element)
+                _, values = updated_elements.setdefault(id(game), (game, {}))
+                values.update(dicted_element)
                 update_info.append("Updated")
             if "Updated" not in update_info:
                 HTTPabort(404, "No elements to update")
-            self.resort()
+
+            async with session.begin():
+                for old_id, new_id in id_changes:
+                    await session.execute(
+                        update(Games).where(Games.id == old_id).values(id=new_id)
+                    )
+                rows = [
+                    {**values, "id": values.get("id", game["id"])}
+                    for game, values in updated_elements.values()
+                ]
+                await update_rows(session, Games, rows)
+                await notify(
+                    session,
+                    self.name,
+                    [
+                        *(old_id for old_id, _ in id_changes),
+                        *(row["id"] for row in rows),
+                    ],
+                )
+
+            for game, values in updated_elements.values():
+                self.unindex(game)
+                if "id" in values:
+                    self.data[values["id"]] = self.data.pop(game["id"])
+                game.update(values)
+                self.index(game)
+            self.publish()
             return update_info
 
+    def raw_record(self, game: dict) -> dict:
+        item_record = super().raw_record(game)
+        if game["id"] >= self.non_steam_border:
+            del item_record["id"]
+        if "store.steampowered.com" in (game["link"] or ""):
+            del item_record["link"]
+        if not (game["picture"] or "").startswith("/static"):
+            del item_record["picture"]
+        if game["picture_mode"] == "landscape":
+            del item_record["picture_mode"]
+        return item_record
+
     async def get_all(self, raw: bool, types: list[str] = []) -> dict | list:
         if raw:
-            async with self.lock:
-                result = []
-                for item in self.data.values():
-                    item_record = {}
-                    for tag in (
-                        "id",
-                        "name",
-                        "subname",
-                        "link",
-                        "picture",
-                        "picture_mode",
-                        "status",
-                        "genre",
-                        "type",
-                        "records",
-                        "comment",
-                        "gift_by",
-                        "order_by",
-                    ):
-                        if tag == "id" and item[tag] >= self.non_steam_border:
-                            continue
-                        if tag == "link" and "store.steampowered.com" in (
-                            item.get(tag) or ""
-                        ):
-                            continue
-                        if tag == "picture" and not (item.get(tag) or "").startswith(
-                            "/static"
-                        ):
-                            continue
-                        if tag == "picture_mode" and item[tag] == "landscape":
-                            continue
-                        item_record[tag] = item[tag]
-                    result.append(item_record)
-
-                return jsonable_encoder(
-                    result,
-                    custom_encoder={
-                        datetime: lambda datetime_obj: (
-                            datetime_obj.isoformat()
-                        ).replace("T", " "),
-                        ddate: lambda date_obj: (date_obj.isoformat()),
-                        dtime: lambda time_obj: (time_obj.isoformat()),
-                    },
-                )
+            return await self.get_raw()
         if types:
             result = {}
             for type in types:
@@ -269,9 +346,58 @@ class GamesData:
             return result
         return self.lists
 
+    def get_listing(
+        self,
+        types: list[str],
+        fields: list[str],
+        limit: int | None,
+        cursor: str | None,
+    ) -> dict:
+        if limit == None:
+            return {
+                game_type: self.project(self.lists.get(game_type, []), fields)
+                for game_type in (types or self.lists)
+            }
+        if len(types) != 1:
+            HTTPabort(422, "Pagination needs exactly one type")
+        return self.get_page(
+            self.keys.get(types[0], []),
+            self.lists.get(types[0], []),
+            limit,
+            cursor,
+            fields,
+        )
+
+    def search(
+        self, query: str, tags: dict[str, str | None], fields: list[str], limit: int
+    ) -> dict:
+        found = self.search_index.match_text(query) if query else None
+        for field, value in tags.items():
+            if value == None:
+                continue
+            matched = self.search_index.match_tag(field, value)
+            found = matched if found == None else found & matched
+        if found == None:
+            HTTPabort(422, "Nothing to search by")
+
+        games = heapq.nsmallest(
+            limit, (self.data[game_id] for game_id in found), key=self.sort_key
+        )
+        return {"total": len(found), "items": self.project(games, fields)}
+
+    def get_payload(self, types: list[str] = []) -> bytes:
+        if types:
+            return wrap_content(
+                dump_json_dict({type: self.payloads.get(type, b"[]") for type in types})
+            )
+        return self.payload
+
     async def get_genres(self, type: str) -> list[str]:
         return self.genres.get(type, [])
 
+    def has_genre(self, genre: str) -> bool:
+        return any(genre in genre_counts for genre_counts in self.genre_counts.values())
+
     async def update_genres(
         self, session: AsyncSession, elements: list[schema_games.UpdatedGenre]
     ) -> list[str]:
@@ -280,10 +406,10 @@ class GamesData:
         async with self.lock:
             update_info = []
             for element in elements:
-                if element.name not in self.genres:
+                if not self.has_genre(element.name):
                     update_info.append("No element")
                     continue
-                if element.new_name in self.genres:
+                if self.has_genre(element.new_name):
                     update_info.append("New name not unique")
                     continue
 
@@ -293,119 +419,104 @@ class GamesData:
                         .where(Games.genre == element.name)
                         .values(genre=element.new_name)
                     )
+                    await notify(
+                        session,
+                        self.name,
+                        [
+                            game["id"]
+                            for game in self.data.values()
+                            if game["genre"] == element.name
+                        ],
+                    )
 
-                    for game_id, game_info in self.data.items():
-                        if game_info["genre"] == element.name:
-                            self.data[game_id]["genre"] == element.new_name
+                for game in self.data.values():
+                    if game["genre"] == element.name:
+                        self.unindex(game)
+                        game["genre"] = element.new_name
+                        self.index(game)
                 update_info.append("Updated")
             if "Updated" not in update_info:
                 HTTPabort(404, "No elements to update")
-            self.resort()
+            self.publish()
             return update_info
 
     async def get_customers(self) -> list:
-        async with self.lock:
-            result = {
-                "all": 0,
-                "gifts": 0,
-                "orders": 0,
-                "gifts+orders": 0,
-                "non-unique games": [],
-                "people": {},
-            }
-            by_customers = {}
-            for game in self.data.values():
-                gift_by = (
-                    [customer.strip() for customer in game["gift_by"].split("+")]
-                    if game["gift_by"]
-                    else []
+        result = {
+            "all": 0,
+            "gifts": 0,
+            "orders": 0,
+            "gifts+orders": 0,
+            "non-unique games": [],
+            "people": {},
+        }
+        by_customers = {}
+        for game in self.data.values():
+            gift_by = (
+                [customer.strip() for customer in game["gift_by"].split("+")]
+                if game["gift_by"]
+                else []
+            )
+            order_by = (
+                [customer.strip() for customer in game["order_by"].split("+")]
+                if game["order_by"]
+                else []
+            )
+            customers = set(gift_by + order_by)
+            if customers:
+                result["all"] += 1
+
+            status = f"({game['status']})" if game["status"] else ""
+            if len(customers) > 1:
+                result["non-unique games"].append(f"{game['name']} {status}".strip())
+
+            for customer in customers:
+                if customer not in by_customers:
+                    by_customers[customer] = {
+                        "gifts": {"list": [], "count": 0},
+                        "orders": {"list": [], "count": 0},
+                        "gifts+orders": {"list": [], "count": 0},
+                        "count": 0,
+                    }
+                if customer in gift_by and customer in order_by:
+                    category = "gifts+orders"
+                elif customer in gift_by:
+                    category = "gifts"
+                elif customer in order_by:
+                    category = "orders"
+
+                by_customers[customer][category]["list"].append(
+                    f"{game['name']} {status}".strip()
                 )
-                order_by = (
-                    [customer.strip() for customer in game["order_by"].split("+")]
-                    if game["order_by"]
-                    else []
+                by_customers[customer][category]["count"] += 1
+                by_customers[customer]["count"] += 1
+
+        result["all"] = f"{result['all']} / {len(self.data)}"
+        result["non-unique games"] = sorted(
+            result["non-unique games"], key=lambda game: game.lower()
+        )
+
+        for customer, info in by_customers.items():
+            for category in ("gifts", "orders", "gifts+orders"):
+                by_customers[customer][category]["list"] = sorted(
+                    info[category]["list"], key=lambda game: game.lower()
                 )
-                customers = set(gift_by + order_by)
-                if customers:
-                    result["all"] += 1
-
-                status = f"({game['status']})" if game["status"] else ""
-                if len(customers) > 1:
-                    result["non-unique games"].append(
-                        f"{game['name']} {status}".strip()
-                    )
+                result[category] += by_customers[customer][category]["count"]
+        result["people"] = by_customers
 
-                for customer in customers:
-                    if customer not in by_customers:
-                        by_customers[customer] = {
-                            "gifts": {"list": [], "count": 0},
-                            "orders": {"list": [], "count": 0},
-                            "gifts+orders": {"list": [], "count": 0},
-                            "count": 0,
-                        }
-                    if customer in gift_by and customer in order_by:
-                        category = "gifts+orders"
-                    elif customer in gift_by:
-                        category = "gifts"
-                    elif customer in order_by:
-                        category = "orders"
-
-                    by_customers[customer][category]["list"].append(
-                        f"{game['name']} {status}".strip()
-                    )
-                    by_customers[customer][category]["count"] += 1
-                    by_customers[customer]["count"] += 1
-
-            result["all"] = f"{result['all']} / {len(self.data)}"
-            result["non-unique games"] = sorted(
-                result["non-unique games"], key=lambda game: game.lower()
-            )
-
-            for customer, info in by_customers.items():
-                for category in ("gifts", "orders", "gifts+orders"):
-                    by_customers[customer][category]["list"] = sorted(
-                        info[category]["list"], key=lambda game: game.lower()
-                    )
-                    result[category] += by_customers[customer][category]["count"]
-            result["people"] = by_customers
-
-            return result
+        return result
 
-    async def update_pictures(
-        self, session: AsyncSession, games_list: list[int]
-    ) -> dict[int, str]:
-        result = {}
-        async with self.lock:
-            for game_id in self.data:
-                if games_list and game_id not in games_list:
-                    continue
+    def has_external_picture(self, game: dict) -> bool:
+        return game["id"] < self.non_steam_border and not (
+            game["picture"] or ""
+        ).startswith("/static")
 
-                if game_id > self.non_steam_border or (
-                    self.data[game_id]["picture"] or ""
-                ).startswith("/static"):
-                    continue
+    def can_enrich(self, game: dict) -> bool:
+        return game["id"] < self.non_steam_border
 
-                new_steam_picture = (await self.check_steam(game_id)).get("picture")
-                if not new_steam_picture:
-                    result[game_id] = "No Steam picture"
-                    continue
+    async def fetch_info(self, game_id: int) -> dict:
+        return await self.check_steam(game_id)
 
-                if new_steam_picture != self.data[game_id]["picture"]:
-                    async with session.begin():
-                        await session.execute(
-                            update(Games)
-                            .where(Games.id == game_id)
-                            .values(picture=new_steam_picture)
-                        )
-                        self.data[game_id]["picture"] = new_steam_picture
-                        result[game_id] = "Updated"
-                else:
-                    if games_list:
-                        result[game_id] = "Not updated"
-
-            for game_id in games_list:
-                if game_id not in result:
-                    result[game_id] = "Not found"
-
-        self.resort()
-        return result
+    def patch(self, game: dict, values: dict) -> None:
+        self.unindex(game)
+        game.update(values)
+        self.index(game)
@@ -1,53 +1,22 @@
-import asyncio
-from datetime import date as ddate
-from datetime import datetime
-from datetime import time as dtime
+from common.utils import dump_json
+from crud._base import BaseData
+from db.models import Lore
 
-from common.config import cfg
-from common.errors import HTTPabort
-from db.common import get_model_dict
-from db.models import SCHEMA, Lore
-from fastapi.encoders import jsonable_encoder
-from schemas import lore as schema_lore
-from sqlalchemy import delete, select, update
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import text
 
-
-class LoreData:
-    def __init__(self) -> None:
-        self.data = {}
-        self.sorted_list = []
-        self.lock = asyncio.Lock()
-
-    async def setup(self, session: AsyncSession) -> None:
-        async with session.begin():
-            db_data = await session.scalars(select(Lore))
-            for row in db_data:
-                self.data[row.id] = get_model_dict(row)
-        self.resort()
-        cfg.logger.info("Lore info was loaded to memory")
-
-    async def reset(self, session: AsyncSession) -> None:
-        async with self.lock:
-            async with session.begin():
-                await session.execute(
-                    text(
-                        f"TRUNCATE TABLE {SCHEMA}.{Lore.__table__.name} RESTART IDENTITY;"
-                    )
-                )
-            self.data = {}
-            self.sorted_list = []
+class LoreData(BaseData):
+    model = Lore
+    title = "Lore"
+    search_type = "lore"
+    raw_tags = ("id", "text", "block_id", "order")
+    ordered = True
 
     def resort(self) -> None:
         sorted_lore = sorted(
             list(self.data.values()), key=lambda lore: (lore["block_id"], lore["order"])
         )
         self.sorted_list = []
-        if not sorted_lore:
-            return
 
-        current_block = sorted_lore[0]["block_id"]
+        current_block = sorted_lore[0]["block_id"] if sorted_lore else None
         current_block_list = []
         for lore in sorted_lore:
             if current_block != lore["block_id"]:
@@ -63,150 +32,12 @@ class LoreData:
             self.sorted_list.append(
                 {"block_id": current_block, "paragraphs": current_block_list}
             )
-
-    async def add(
-        self, session: AsyncSession, elements: list[schema_lore.NewElement]
-    ) -> list[int]:
-        if not elements:
-            return HTTPabort(422, "Empty list")
-        async with self.lock:
-            inserted_elements_count = 0
-            inserted_ids = []
-            for element in elements:
-                if element.order and 1 <= element.order <= (len(self.data) + 1):
-                    async with session.begin():
-                        await session.execute(
-                            update(Lore)
-                            .where(Lore.order >= element.order)
-                            .values(order=Lore.order + 1)
-                        )
-                        for lore_id in self.data:
-                            if self.data[lore_id]["order"] >= element.order:
-                                self.data[lore_id]["order"] += 1
-                else:
-                    element.order = len(self.data) + 1
-
-                async with session.begin():
-                    dicted_element = element.model_dump()
-
-                    new_lore = Lore(**dicted_element)
-                    session.add(new_lore)
-                    await session.flush()
-                    await session.refresh(new_lore)
-
-                    dicted_element["id"] = new_lore.id
-                    self.data[new_lore.id] = dicted_element
-
-                    inserted_ids.append(new_lore.id)
-                    inserted_elements_count += 1
-            if not inserted_elements_count:
-                HTTPabort(409, "Elements already exist")
-            self.resort()
-            return inserted_ids
-
-    async def delete(
-        self, session: AsyncSession, elements: list[schema_lore.DeletedElement]
-    ) -> list[bool]:
-        if not elements:
-            return HTTPabort(422, "Empty list")
-        async with self.lock:
-            delete_info = []
-            for element in elements:
-                if element.id not in self.data:
-                    delete_info.append(False)
-                    continue
-                async with session.begin():
-                    await session.execute(delete(Lore).where(Lore.id == element.id))
-                    await session.execute(
-                        update(Lore)
-                        .where(Lore.order > self.data[element.id]["order"])
-                        .values(order=Lore.order - 1)
-                    )
-                    for lore_id in self.data:
-                        if self.data[lore_id]["order"] > self.data[element.id]["order"]:
-                            self.data[lore_id]["order"] -= 1
-                    del self.data[element.id]
-                    delete_info.append(True)
-            if True not in delete_info:
-                HTTPabort(404, "No elements to delete")
-            self.resort()
-            return delete_info
-
-    async def update(
-        self, session: AsyncSession, elements: list[schema_lore.UpdatedElement]
-    ) -> list[str]:
-        if not elements:
-            return HTTPabort(422, "Empty list")
-        async with self.lock:
-            update_info = []
-            for element in elements:
-                if element.id not in self.data:
-                    update_info.append("No element")
-                    continue
-                dicted_element = element.model_dump(exclude={"id"}, exclude_none=True)
-                if dicted_element.get("order") != None:
-                    if 1 <= element.order <= len(self.data):
-                        changed_orders = []
-                        change = 1
-
-                        if dicted_element["order"] < self.data[element.id]["order"]:
-                            changed_orders = list(
-                                range(
-                                    dicted_element["order"],
-                                    self.data[element.id]["order"],
-                                )
-                            )
-                        elif dicted_element["order"] > self.data[element.id]["order"]:
-                            changed_orders = list(
-                                range(
-                                    self.data[element.id]["order"] + 1,
-                                    dicted_element["order"] + 1,
-                                )
-                            )
-                            change = -1
-
-                        if changed_orders:
-                            async with session.begin():
-                                await session.execute(
-                                    update(Lore)
-                                    .where(Lore.order.in_(changed_orders))
-                                    .values(order=Lore.order + change)
-                                )
-                                for lore_id in self.data:
-                                    if self.data[lore_id]["order"] in changed_orders:
-                                        self.data[lore_id]["order"] += change
-                    else:
-                        del dicted_element["order"]
-
-                async with session.begin():
-                    await session.execute(
-                        update(Lore).where(Lore.id == element.id).values(dicted_element)
-                    )
-                self.data[element.id].update(dicted_element)
-                update_info.append("Updated")
-            if "Updated" not in update_info:
-                HTTPabort(404, "No elements to update")
-            self.resort()
-            return update_info
-
-    async def get_all(self, raw: bool) -> list[dict]:
-        if raw:
-            async with self.lock:
-                result = []
-                for item in self.data.values():
-                    item_record = {}
-                    for tag in ("id", "text", "block_id", "order"):
-                        item_record[tag] = item[tag]
-                    result.append(item_record)
-
-                return jsonable_encoder(
-                    result,
-                    custom_encoder={
-                        datetime: lambda datetime_obj: (
-                            datetime_obj.isoformat()
-                        ).replace("T", " "),
-                        ddate: lambda date_obj: (date_obj.isoformat()),
-                        dtime: lambda time_obj: (time_obj.isoformat()),
-                    },
-                )
-        return self.sorted_list
+        self.store_payload(dump_json(self.sorted_list))
+
+    def search_entry(self, item: dict) -> tuple[list[tuple[str, int]], dict]:
+        fields = [(item["block_id"], 2), (item["text"], 1)]
+        return fields, {
+            "title": item["block_id"],
+            "subtitle": item["text"][:200],
+            "status": None,
+        }
@@ -1,10 +1,13 @@
 import asyncio
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from typing import Any
 
 from common.config import cfg
+from common.counters import get_counters
+from db.common import get_engine
 from db.models import SCHEMA, TwitchBotCounters
-from sqlalchemy import delete, select, update
+from db.notify import notify
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
 
@@ -14,6 +17,12 @@ class TwitchBotCounter:
         self.data = {}
         self.type = counter_type
         self.lock = asyncio.Lock()
+        self.name = ""
+        # increments not saved to database yet
+        self.pending = {}
+        self.pending_updates = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
 
     async def setup(self, session: AsyncSession) -> None:
         async with session.begin():
@@ -24,16 +33,57 @@ class TwitchBotCounter:
                 element.name: {"count": element.value, "updated": element.updated}
                 for element in db_data
             }
+        await get_counters().load(
+            self.type, {name: info["count"] for name, info in self.data.items()}
+        )
+        if self.task == None:
+            self.task = asyncio.create_task(self.flush_worker())
 
         cfg.logger.info(f"TwitchBot {self.type} counter info was loaded to memory")
 
+    async def reload(self, session: AsyncSession, names: list[str] | None) -> None:
+        async with self.lock:
+            async with session.begin():
+                query = select(TwitchBotCounters).where(
+                    TwitchBotCounters.type == self.type
+                )
+                if names != None:
+                    query = query.where(TwitchBotCounters.name.in_(names))
+                db_data = await session.scalars(query)
+                fresh = {
+                    element.name: {"count": element.value, "updated": element.updated}
+                    for element in db_data
+                }
+            if names == None:
+                names = list(self.data | fresh)
+            for name in names:
+                if name in fresh:
+                    if name in self.pending:
+                        fresh[name]["count"] += self.pending[name]["increment"]
+                    self.data[name] = fresh[name]
+                else:
+                    self.data.pop(name, None)
+            # shared backend is already changed by worker that sent notification
+            counters = get_counters()
+            if not counters.shared:
+                await counters.delete(
+                    self.type, [name for name in names if name not in fresh]
+                )
+                await counters.load(
+                    self.type, {name: info["count"] for name, info in fresh.items()}
+                )
+
     async def reset(self, session: AsyncSession) -> None:
         async with self.lock:
             async with session.begin():
                 await session.execute(
                     delete(TwitchBotCounters).where(TwitchBotCounters.type == self.type)
                 )
+                await notify(session, self.name)
+            await get_counters().delete(self.type, list(self.data))
             self.data = {}
+            self.pending = {}
+            self.pending_updates = 0
 
     async def reset_all(self, session: AsyncSession) -> None:
         async with self.lock:
@@ -43,16 +93,24 @@ class TwitchBotCounter:
                         f"TRUNCATE TABLE {SCHEMA}.{TwitchBotCounters.__table__.name} RESTART IDENTITY;"
                     )
                 )
+                await notify(session, "TWITCHBOT_COUNTERS")
+            await get_counters().clear()
             self.data = {}
+            self.pending = {}
+            self.pending_updates = 0
 
     async def set(self, session: AsyncSession, name: str, value: int) -> str:
         async with self.lock:
+            # new value replaces not saved increments
+            self.pending.pop(name, None)
             async with session.begin():
                 if name not in self.data:
                     if value > -1:
                         session.add(
                             TwitchBotCounters(name=name, type=self.type, value=value)
                         )
+                        await notify(session, self.name, [name])
+                        await get_counters().set(self.type, name, value)
                         self.data[name] = {"count": value, "updated": None}
                         return str(value)
                     else:
@@ -67,6 +125,8 @@ class TwitchBotCounter:
                             )
                             .values(value=value)
                         )
+                        await notify(session, self.name, [name])
+                        await get_counters().set(self.type, name, value)
                         self.data[name]["count"] = value
                         return str(value)
                     else:
@@ -76,45 +136,128 @@ class TwitchBotCounter:
                                 TwitchBotCounters.type == self.type,
                             )
                         )
+                        await notify(session, self.name, [name])
+                        await get_counters().delete(self.type, [name])
                         del self.data[name]
                         return "удалено"
 
     async def get_value(self, name: str, default: Any) -> int | None:
-        async with self.lock:
-            return self.data.get(name, {}).get("count", default)
+        # readers don't wait for lock, backend values change atomically
+        info = self.data.get(name)
+        if info == None:
+            return default
+        counts = await get_counters().get(self.type, [name])
+        return counts.get(name, info["count"])
 
     async def get_all(self, raw: bool = False) -> str:
         sep = ", "
         if raw:
             sep = "\n"
-        async with self.lock:
-            return sep.join(
-                f"{name}: {info['count']}" for name, info in self.data.items()
-            )
+        snapshot = dict(self.data)
+        counts = await get_counters().get(self.type, list(snapshot))
+        return sep.join(
+            f"{name}: {counts.get(name, info['count'])}"
+            for name, info in snapshot.items()
+        )
 
-    async def update(
-        self, session: AsyncSession, name: str, with_delay: bool, increment: int = 1
-    ) -> str:
+    async def update(self, name: str, with_delay: bool, increment: int = 1) -> str:
         async with self.lock:
             if name not in self.data:
                 return "Нет счётчика"
 
+            counters = get_counters()
+            # every update starts new delay, like updated time did before
+            if with_delay:
+                if not await counters.throttle(self.type, name, 30):
+                    return "Cлишком быстрое изменение счётчика"
+            else:
+                await counters.refresh_throttle(self.type, name, 30)
+
             now = datetime.now(timezone.utc)
-            updated = self.data[name]["updated"] or datetime.fromisoformat(
-                "1970-01-01T00:00:00+00:00"
-            )
-            if with_delay and (now - updated < timedelta(seconds=30)):
-                return "Cлишком быстрое изменение счётчика"
+            count = await counters.incr(self.type, name, increment)
+            self.data[name]["count"] = count
+            self.data[name]["updated"] = now
+            if name not in self.pending:
+                self.pending[name] = {"increment": 0, "updated": now}
+            self.pending[name]["increment"] += increment
+            self.pending[name]["updated"] = now
+            self.pending_updates += 1
 
-            async with session.begin():
-                await session.execute(
-                    update(TwitchBotCounters)
-                    .where(
-                        TwitchBotCounters.name == name,
-                        TwitchBotCounters.type == self.type,
-                    )
-                    .values(value=(self.data[name]["count"] + increment), updated=now)
-                )
-                self.data[name]["count"] += increment
-                self.data[name]["updated"] = now
-            return str(self.data[name]["count"])
+        if cfg.COUNTERS_FLUSH_INTERVAL <= 0:
+            await self.flush()
+        elif self.pending_updates >= cfg.COUNTERS_FLUSH_SIZE:
+            self.wakeup.set()
+        return str(count)
+
+    async def flush(self) -> None:
+        async with self.lock:
+            if not self.pending:
+                return
+            table = TwitchBotCounters.__table__
+            counters = get_counters()
+            if counters.shared:
+                # shared backend has increments of all workers and values set
+                # after them, database gets the same value
+                values = await counters.get(self.type, list(self.pending))
+                value = bindparam("new_value")
+                rows = [
+                    {
+                        "counter_name": name,
+                        "new_value": values[name],
+                        "last_update": info["updated"],
+                    }
+                    for name, info in self.pending.items()
+                    if name in values
+                ]
+            else:
+                # increments are added, so other workers' ones are kept
+                value = table.c.value + bindparam("increment")
+                rows = [
+                    {
+                        "counter_name": name,
+                        "increment": info["increment"],
+                        "last_update": info["updated"],
+                    }
+                    for name, info in self.pending.items()
+                ]
+            async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+                async with session.begin():
+                    if rows:
+                        await session.execute(
+                            update(table)
+                            .where(
+                                table.c.name == bindparam("counter_name"),
+                                table.c.type == self.type,
+                            )
+                            .values(value=value, updated=bindparam("last_update")),
+                            rows,
+                        )
+                    await notify(session, self.name, list(self.pending))
+            self.pending = {}
+            self.pending_updates = 0
+
+    async def flush_worker(self) -> None:
+        # without interval every increment is saved by update itself
+        interval = (
+            cfg.COUNTERS_FLUSH_INTERVAL if cfg.COUNTERS_FLUSH_INTERVAL > 0 else None
+        )
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                cfg.logger.error(f"Error saving {self.type} counters: {e}")
+
+    async def stop(self) -> None:
+        if self.task != None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            cfg.logger.error(f"Error saving {self.type} counters: {e}")
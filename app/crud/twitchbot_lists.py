@@ -1,21 +1,37 @@
 import asyncio
-import random
-from datetime import datetime
 
 from common.config import cfg
 from common.errors import HTTPabort
+from common.utils import rng
+from db.common import delete_rows, insert_rows, update_rows
 from db.models import SCHEMA, TwitchBotLists
+from db.notify import notify
 from schemas import twitchbot
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
 
 
+def normalize(value: str) -> str:
+    return value.lower().strip()
+
+
 class TwitchBotList:
     def __init__(self, category: str) -> None:
         self.data = {}
         self.category = category
         self.lock = asyncio.Lock()
+        self.name = ""
+        # dense values for random choice, position of every id in them
+        self.ids = []
+        self.values = []
+        self.positions = {}
+        # value -> number of elements with it, exact for add, normalized for has
+        self.exact = {}
+        self.normalized = {}
+        # replaced after every change, read without lock
+        self.snapshot = {}
+        self.raw = ""
 
     async def setup(
         self,
@@ -26,9 +42,77 @@ class TwitchBotList:
                 select(TwitchBotLists).where(TwitchBotLists.category == self.category)
             )
             self.data = {element.id: element.value for element in db_data}
+        self.rebuild()
 
         cfg.logger.info(f"TwitchBot {self.category} info was loaded to memory")
 
+    async def reload(self, session: AsyncSession, ids: list[int] | None) -> None:
+        async with self.lock:
+            async with session.begin():
+                query = select(TwitchBotLists).where(
+                    TwitchBotLists.category == self.category
+                )
+                if ids != None:
+                    query = query.where(TwitchBotLists.id.in_(ids))
+                db_data = await session.scalars(query)
+                fresh = {element.id: element.value for element in db_data}
+            if ids == None:
+                self.data = fresh
+                self.rebuild()
+                return
+            for element_id in ids:
+                if element_id in fresh:
+                    self.set_value(element_id, fresh[element_id])
+                elif element_id in self.data:
+                    self.remove(element_id)
+            self.publish()
+
+    def rebuild(self) -> None:
+        self.ids = list(self.data)
+        self.values = list(self.data.values())
+        self.positions = {
+            element_id: position for position, element_id in enumerate(self.ids)
+        }
+        self.exact = {}
+        self.normalized = {}
+        for value in self.values:
+            self.count_value(value, 1)
+        self.publish()
+
+    def publish(self) -> None:
+        self.snapshot = dict(self.data)
+        self.raw = "|||||".join(self.snapshot.values())
+
+    def count_value(self, value: str, change: int) -> None:
+        for counts, key in ((self.exact, value), (self.normalized, normalize(value))):
+            counts[key] = counts.get(key, 0) + change
+            if not counts[key]:
+                del counts[key]
+
+    def set_value(self, element_id: int, value: str) -> None:
+        if element_id in self.positions:
+            position = self.positions[element_id]
+            self.count_value(self.values[position], -1)
+            self.values[position] = value
+        else:
+            self.positions[element_id] = len(self.ids)
+            self.ids.append(element_id)
+            self.values.append(value)
+        self.count_value(value, 1)
+        self.data[element_id] = value
+
+    def remove(self, element_id: int) -> None:
+        # last element takes place of removed one
+        position = self.positions.pop(element_id)
+        self.count_value(self.values[position], -1)
+        last_id = self.ids.pop()
+        last_value = self.values.pop()
+        if last_id != element_id:
+            self.ids[position] = last_id
+            self.values[position] = last_value
+            self.positions[last_id] = position
+        del self.data[element_id]
+
     async def reset(self, session: AsyncSession) -> None:
         async with self.lock:
             async with session.begin():
@@ -37,7 +121,9 @@ class TwitchBotList:
                         TwitchBotLists.category == self.category
                     )
                 )
+                await notify(session, self.name)
             self.data = {}
+            self.rebuild()
 
     async def reset_all(self, session: AsyncSession) -> None:
         async with self.lock:
@@ -47,6 +133,7 @@ class TwitchBotList:
                         f"TRUNCATE TABLE {SCHEMA}.{TwitchBotLists.__table__.name} RESTART IDENTITY;"
                     )
                 )
+                await notify(session, "TWITCHBOT_LISTS")
 
     async def add(
         self, session: AsyncSession, elements: list[twitchbot.NewElement]
@@ -54,25 +141,27 @@ class TwitchBotList:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            inserted_elements_count = 0
             inserted_ids = []
+            values = set()
+            new_elements = []
             for element in elements:
-                if element.value in self.data.values():
+                if element.value in self.exact or element.value in values:
                     inserted_ids.append(-1)
                     continue
-                async with session.begin():
-                    new_element = TwitchBotLists(
-                        value=element.value, category=self.category
-                    )
-                    session.add(new_element)
-                    await session.flush()
-                    await session.refresh(new_element)
-                    self.data[new_element.id] = new_element.value
-                    inserted_ids.append(new_element.id)
-                    inserted_elements_count += 1
-            if not inserted_elements_count:
+                values.add(element.value)
+                inserted_ids.append(len(new_elements))
+                new_elements.append({"value": element.value, "category": self.category})
+            if not new_elements:
                 HTTPabort(409, "Elements already exist")
-            return inserted_ids
+
+            async with session.begin():
+                new_ids = await insert_rows(session, TwitchBotLists, new_elements)
+                await notify(session, self.name, new_ids)
+
+            for element_id, new_element in zip(new_ids, new_elements):
+                self.set_value(element_id, new_element["value"])
+            self.publish()
+            return [new_ids[index] if index != -1 else -1 for index in inserted_ids]
 
     async def delete(
         self, session: AsyncSession, elements: list[twitchbot.DeletedElement]
@@ -80,52 +169,52 @@ class TwitchBotList:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            deleted_elements_count = 0
-            for element in elements:
-                if element.id not in self.data:
-                    continue
-                async with session.begin():
-                    await session.execute(
-                        delete(TwitchBotLists).where(TwitchBotLists.id == element.id)
-                    )
-                del self.data[element.id]
-                deleted_elements_count += 1
-            if not deleted_elements_count:
+            ids_for_delete = list(
+                {element.id: None for element in elements if element.id in self.data}
+            )
+            if not ids_for_delete:
                 HTTPabort(404, "No elements to delete")
 
+            async with session.begin():
+                await delete_rows(session, TwitchBotLists, ids_for_delete)
+                await notify(session, self.name, ids_for_delete)
+
+            for element_id in ids_for_delete:
+                self.remove(element_id)
+            self.publish()
+
     async def update(
         self, session: AsyncSession, elements: list[twitchbot.UpdatedElement]
     ) -> None:
         if not elements:
             return HTTPabort(422, "Empty list")
         async with self.lock:
-            updated_elements_count = 0
-            for element in elements:
-                if element.id not in self.data:
-                    continue
-                async with session.begin():
-                    await session.execute(
-                        update(TwitchBotLists)
-                        .where(TwitchBotLists.id == element.id)
-                        .values(value=element.value)
-                    )
-                self.data[element.id] = element.value
-                updated_elements_count += 1
-            if not updated_elements_count:
+            rows = [
+                {"id": element.id, "value": element.value}
+                for element in elements
+                if element.id in self.data
+            ]
+            if not rows:
                 HTTPabort(404, "No elements to update")
 
+            async with session.begin():
+                await update_rows(session, TwitchBotLists, rows)
+                await notify(session, self.name, [row["id"] for row in rows])
+
+            for row in rows:
+                self.set_value(row["id"], row["value"])
+            self.publish()
+
     async def get_all(self, raw: bool) -> dict[int, str]:
-        async with self.lock:
-            if raw:
-                return "|||||".join(self.data.values())
-            return self.data
+        if raw:
+            return self.raw
+        return self.snapshot
 
     def get_random(self) -> str:
-        if self.data:
-            random.seed(datetime.now().timestamp())
-            return random.choice(list(self.data.values()))
+        if self.values:
+            return rng.choice(self.values)
         else:
             return ""
 
     def has(self, value: str) -> bool:
-        return value in self.data.values()
+        return normalize(value) in self.normalized
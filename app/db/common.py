@@ -1,11 +1,83 @@
 import sys
+import time
 from typing import Any
 
 from common.config import cfg
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.sql import text
 
-_engine = create_async_engine(cfg.DB_CONNECTION_STRING)
+_engine = None
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waited = 0
+        self.wait_ms_total = 0
+        self.wait_ms_max = 0
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait_ms = (time.perf_counter() - started) * 1000
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            # slow checkouts: waiting for free connection or opening new one
+            if wait_ms >= 1:
+                self.waited += 1
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_ms_total / (self.checkouts or 1), 3),
+            "wait_ms_max": round(self.wait_ms_max, 3),
+        }
+
+
+def init_engine() -> AsyncEngine:
+    # created after secrets are loaded, not at import
+    global _engine
+    if _engine == None:
+        _engine = create_async_engine(
+            cfg.DB_CONNECTION_STRING,
+            poolclass=MeteredPool,
+            pool_size=cfg.DB_POOL_SIZE,
+            max_overflow=cfg.DB_MAX_OVERFLOW,
+            pool_timeout=cfg.DB_POOL_TIMEOUT,
+            pool_recycle=cfg.DB_POOL_RECYCLE,
+            pool_pre_ping=cfg.DB_POOL_PRE_PING,
+            query_cache_size=cfg.DB_STATEMENT_CACHE_SIZE,
+            connect_args={
+                "prepared_statement_cache_size": cfg.DB_PREPARED_STATEMENT_CACHE_SIZE
+            },
+        )
+    return _engine
+
+
+def get_engine() -> AsyncEngine:
+    return _engine
+
+
+def get_pool_metrics() -> dict[str, Any]:
+    return _engine.pool.get_metrics()
 
 
 async def get_session() -> AsyncSession:
@@ -27,3 +99,40 @@ def get_model_dict(model: Any) -> dict[str, Any]:
     return {
         column.name: getattr(model, column.name) for column in model.__table__.columns
     }
+
+
+def get_row_dict(model: Any, values: dict[str, Any]) -> dict[str, Any]:
+    # same keys and order as rows loaded with get_model_dict
+    return {column.name: values.get(column.name) for column in model.__table__.columns}
+
+
+async def insert_rows(session: AsyncSession, model: Any, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    # multi-row VALUES needs the same columns in every row, so rows are
+    # grouped by their keys and missing columns keep database defaults
+    groups = {}
+    for position, row in enumerate(rows):
+        groups.setdefault(tuple(sorted(row)), []).append(position)
+    ids = [None] * len(rows)
+    for positions in groups.values():
+        inserted = await session.execute(
+            insert(model)
+            .values([rows[position] for position in positions])
+            .returning(model.id)
+        )
+        for position, (id,) in zip(positions, inserted):
+            ids[position] = id
+    return ids
+
+
+async def update_rows(session: AsyncSession, model: Any, rows: list[dict]) -> None:
+    # one executemany UPDATE by primary key, rows are applied in the given order
+    rows = [row for row in rows if len(row) > 1]
+    if rows:
+        await session.execute(update(model), rows)
+
+
+async def delete_rows(session: AsyncSession, model: Any, ids: list[int]) -> None:
+    if ids:
+        await session.execute(delete(model).where(model.id.in_(ids)))
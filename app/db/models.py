@@ -1,5 +1,6 @@
 from datetime import date as ddate
 from datetime import datetime
+from typing import Any
 
 from sqlalchemy import MetaData
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column
@@ -185,3 +186,23 @@ class DataParams(Base):
     value_int: Mapped[int] = mapped_column(nullable=True)
     value_float: Mapped[float] = mapped_column(nullable=True)
     value_str: Mapped[str] = mapped_column(nullable=True)
+
+
+class ExternalInfo(Base):
+    __tablename__ = "external_info"
+
+    provider: Mapped[str] = mapped_column(primary_key=True)
+    external_id: Mapped[int] = mapped_column(BIGINT, primary_key=True)
+    info: Mapped[dict[str, str | int]] = mapped_column(JSON, nullable=False)
+    fetched: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class DiscordOutbox(Base):
+    __tablename__ = "discord_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    hook: Mapped[str] = mapped_column(nullable=False)
+    embed: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    attempts: Mapped[int] = mapped_column(nullable=False)
+    created: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    next_try: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
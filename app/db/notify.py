@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import asyncpg
+from common.config import cfg
+from db.common import get_engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
+
+CHANNEL = "pwsi_data"
+# NOTIFY payload must be shorter than 8000 bytes
+MAX_PAYLOAD = 7500
+LEADER_LOCK = 7_310_925_001
+WORKER_ID = uuid4().hex
+
+_listener = None
+
+
+async def notify(session: AsyncSession, domain: str, ids: list | None = None) -> None:
+    # sent with transaction commit, other workers reload changed rows
+    if get_engine().dialect.name != "postgresql":
+        return
+    payload = json.dumps({"worker": WORKER_ID, "domain": domain, "ids": ids})
+    if len(payload) > MAX_PAYLOAD:
+        payload = json.dumps({"worker": WORKER_ID, "domain": domain, "ids": None})
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload);"),
+        {"channel": CHANNEL, "payload": payload},
+    )
+
+
+class Listener:
+    def __init__(self, handler: Callable[[dict | None], Awaitable[None]]) -> None:
+        self.handler = handler
+        self.leader = False
+        self.task = None
+
+    async def run(self) -> None:
+        dsn = get_engine().url.set(drivername="postgresql")
+        connected_before = False
+        while True:
+            connection = None
+            # new queue for every connection, so old close event is not seen
+            queue = asyncio.Queue()
+
+            def on_notify(connection, pid, channel, payload) -> None:
+                message = json.loads(payload)
+                if message["worker"] != WORKER_ID:
+                    queue.put_nowait(message)
+
+            def on_close(connection) -> None:
+                queue.put_nowait(None)
+
+            try:
+                connection = await asyncpg.connect(
+                    dsn.render_as_string(hide_password=False)
+                )
+                connection.add_termination_listener(on_close)
+                await connection.add_listener(CHANNEL, on_notify)
+                if connected_before:
+                    # notifications could be missed while reconnecting
+                    await self.handler(None)
+                connected_before = True
+                await self.listen(connection, queue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                cfg.logger.error(f"Data notifications listener error: {e}")
+            finally:
+                self.leader = False
+                if connection != None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(5)
+
+    async def listen(
+        self, connection: asyncpg.Connection, queue: asyncio.Queue
+    ) -> None:
+        next_election = 0
+        while True:
+            if not self.leader and time.monotonic() >= next_election:
+                # lock is held by connection, released if worker dies
+                self.leader = await connection.fetchval(
+                    "SELECT pg_try_advisory_lock($1);", LEADER_LOCK
+                )
+                next_election = time.monotonic() + 30
+            try:
+                message = await asyncio.wait_for(queue.get(), 30)
+            except asyncio.TimeoutError:
+                continue
+            if message == None:
+                return
+            try:
+                await self.handler(message)
+            except Exception as e:
+                cfg.logger.error(f"Error applying notification {message}: {e}")
+
+
+def start_listener(handler: Callable[[dict | None], Awaitable[None]]) -> None:
+    global _listener
+    if get_engine().dialect.name != "postgresql" or _listener != None:
+        return
+    _listener = Listener(handler)
+    _listener.task = asyncio.create_task(_listener.run())
+
+
+async def stop_listener() -> None:
+    global _listener
+    if _listener != None:
+        _listener.task.cancel()
+        await asyncio.gather(_listener.task, return_exceptions=True)
+        _listener = None
+
+
+def is_leader() -> bool:
+    # without postgres there is single worker, it does all background work
+    if get_engine().dialect.name != "postgresql":
+        return True
+    # workers started before listener won advisory lock aren't leaders yet
+    return _listener != None and _listener.leader
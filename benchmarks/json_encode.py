@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, time, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+from common.utils import dump_json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+GAMES = 10_000
+RUNS = 10
+
+OLD_ENCODERS = {
+    datetime: lambda datetime_obj: (datetime_obj.isoformat()).replace("T", " "),
+    date: lambda date_obj: (date_obj.isoformat()),
+    time: lambda time_obj: (time_obj.isoformat()),
+}
+
+
+def make_games(count: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "id": game_id,
+            "name": f"Игра {game_id}",
+            "subname": rng.choice([None, "Remastered", "Director's cut"]),
+            "link": f"https://store.steampowered.com/app/{game_id}",
+            "picture": f"https://cdn.akamai.steamstatic.com/steam/apps/{game_id}/header.jpg",
+            "picture_mode": "contain",
+            "status": rng.choice(["Пройдено", "Дропнуто", None]),
+            "genre": rng.choice(["Хоррор", "RPG", "Платформер"]),
+            "type": rng.choice(["main", "stream", None]),
+            "records": [
+                {"name": "Run", "value": rng.randint(0, 10_000)}
+                for _ in range(rng.randint(0, 3))
+            ],
+            "comment": None,
+            "gift_by": rng.choice([None, "viewer"]),
+            "order_by": None,
+            "updated": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        }
+        for game_id in range(count)
+    ]
+
+
+def old_encode(games: list[dict]) -> bytes:
+    content = jsonable_encoder(games, custom_encoder=OLD_ENCODERS)
+    return JSONResponse(content={"content": content}).body
+
+
+def new_encode(games: list[dict]) -> bytes:
+    return dump_json({"content": games})
+
+
+def main() -> None:
+    games = make_games(GAMES)
+    if old_encode(games) != new_encode(games):
+        sys.exit("Encoders give different output")
+
+    print(f"{GAMES} games, best of {RUNS} runs")
+    for name, encode in (
+        ("jsonable_encoder + JSONResponse", old_encode),
+        ("dump_json (orjson)", new_encode),
+    ):
+        best = min(timeit.repeat(lambda: encode(games), number=1, repeat=RUNS))
+        print(f"{name:<32} {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
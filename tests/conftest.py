@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import sys
+import types
+from datetime import timezone
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "app"))
+
+# config reads config.yaml and secrets at import, tests get plain options
+config = types.ModuleType("common.config")
+config.cfg = types.SimpleNamespace(
+    logger=logging.getLogger("tests"),
+    ENV="dev",
+    EXTERNAL_TTL=30 * 24 * 3600,
+    EXTERNAL_MISS_TTL=24 * 3600,
+    EXTERNAL_CONCURRENCY=5,
+    EXTERNAL_BATCH=50,
+    DISCORD_BATCH_DELAY=1,
+    COUNTERS_BACKEND="local",
+    COUNTERS_FLUSH_INTERVAL=5,
+    COUNTERS_FLUSH_SIZE=50,
+)
+sys.modules["common.config"] = config
+
+import db.common as db_common  # noqa: E402
+from common.search import SearchIndex  # noqa: E402
+from crud import _base as base  # noqa: E402
+from db.models import SCHEMA, Base  # noqa: E402
+from sqlalchemy import DateTime, event  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+
+class AwareDateTime(sqlite.DATETIME):
+    # sqlite keeps no time zone, all stored times are utc like in postgres
+    def result_processor(self, dialect, coltype):
+        process = super().result_processor(dialect, coltype)
+
+        def result(value):
+            value = process(value)
+            return value.replace(tzinfo=timezone.utc) if value != None else None
+
+        return result
+
+
+for table in Base.metadata.tables.values():
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            column.type = AwareDateTime()
+
+
+async def make_engine() -> AsyncEngine:
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_schema(connection, record) -> None:
+        connection.execute(f"ATTACH DATABASE ':memory:' AS {SCHEMA}")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest.fixture
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def engine(run):
+    engine = run(make_engine())
+    db_common._engine = engine
+    yield engine
+    run(engine.dispose())
+    db_common._engine = None
+
+
+@pytest.fixture
+def write(run, engine):
+    # calls domain method with its own session, like request handlers do
+    def write(method, *args):
+        async def call():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                return await method(session, *args)
+
+        return run(call())
+
+    return write
+
+
+@pytest.fixture
+def load(write):
+    # fresh domain built from database rows, result of full rebuild
+    def load(domain_class):
+        domain = domain_class()
+        domain.enrich_later = lambda ids: None
+        write(domain.setup)
+        return domain
+
+    return load
+
+
+@pytest.fixture(autouse=True)
+def site_search(monkeypatch):
+    # every test starts with empty site search, filled by domains it loads
+    index = SearchIndex()
+    monkeypatch.setattr(base, "site_search", index)
+    return index
+
+
+def state(value: Any) -> Any:
+    return vars(value) if hasattr(value, "__dict__") else value
+
+
+@pytest.fixture
+def assert_rebuilt(load, monkeypatch, site_search):
+    # domains after writes must match fresh load of the same rows,
+    # attrs are extra domain structures compared by name
+    def assert_rebuilt(*domains, attrs: tuple[str, ...] = ()) -> None:
+        fresh_search = SearchIndex()
+        monkeypatch.setattr(base, "site_search", fresh_search)
+        fresh_domains = [load(type(domain)) for domain in domains]
+        monkeypatch.setattr(base, "site_search", site_search)
+
+        for domain, fresh in zip(domains, fresh_domains):
+            assert domain.data == fresh.data
+            # same bytes give same etag in every worker
+            assert [list(item) for item in domain.data.values()] == [
+                list(item) for item in fresh.data.values()
+            ]
+            for attr in attrs:
+                assert state(getattr(domain, attr)) == state(getattr(fresh, attr))
+            assert domain.get_payload() == fresh.get_payload()
+            assert domain.etag == fresh.etag
+        assert vars(site_search) == vars(fresh_search)
+
+    return assert_rebuilt
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+from crud.anime import AnimeData
+from schemas import anime as schema_anime
+
+
+async def no_mal(anime_id: int) -> dict:
+    return {}
+
+
+def make_anime(load) -> AnimeData:
+    anime = load(AnimeData)
+    anime.get_anime_mal_info = no_mal
+    return anime
+
+
+ANIME_STATE = ("series", "entries", "sorted_keys", "sorted_list", "fragments")
+
+
+def time(day: int) -> datetime:
+    return datetime(2024, 1, day, tzinfo=timezone.utc)
+
+
+def new_anime(anime_id: int, name: str, **values) -> schema_anime.NewElement:
+    return schema_anime.NewElement(id=anime_id, name=name, added_time=time(1), **values)
+
+
+def add_anime(anime: AnimeData, write) -> None:
+    write(
+        anime.add,
+        [
+            new_anime(
+                1,
+                "Monogatari",
+                series="Monogatari",
+                status="Просмотрено",
+                score=9,
+                completed_time=time(2),
+            ),
+            new_anime(
+                2,
+                "Nisemonogatari",
+                series="Monogatari",
+                status="Просмотрено",
+                score=8,
+                completed_time=time(5),
+            ),
+            new_anime(3, "Owarimonogatari", series="Monogatari", status="Смотрим"),
+            new_anime(4, "Naruto", status="Заброшено", completed_time=time(3)),
+            new_anime(5, "Mushishi", score=10),
+        ],
+    )
+
+
+def test_add_matches_rebuild(load, write, assert_rebuilt):
+    anime = make_anime(load)
+    add_anime(anime, write)
+    assert_rebuilt(anime, attrs=ANIME_STATE)
+    series = next(entry for entry in anime.sorted_list if entry["name"] == "Monogatari")
+    assert series["status"] == "Смотрим"
+    assert series["score"] == 8.5
+
+
+def test_update_matches_rebuild(load, write, assert_rebuilt):
+    anime = make_anime(load)
+    add_anime(anime, write)
+
+    write(
+        anime.update,
+        [
+            schema_anime.UpdatedElement(id=3, status="Просмотрено"),
+            # leaves series for another one, then standalone one joins it
+            schema_anime.UpdatedElement(id=2, series="Bakemonogatari"),
+            schema_anime.UpdatedElement(id=5, series="Bakemonogatari", score=7),
+        ],
+    )
+    assert anime.series["Bakemonogatari"] == {2, 5}
+    assert_rebuilt(anime, attrs=ANIME_STATE)
+
+    write(
+        anime.update,
+        [
+            schema_anime.UpdatedElement(id=4, status="Смотрим"),
+            schema_anime.UpdatedElement(id=1, new_id=10),
+            schema_anime.UpdatedElement(id=2, series=""),
+        ],
+    )
+    assert 10 in anime.data and 1 not in anime.data
+    assert_rebuilt(anime, attrs=ANIME_STATE)
+
+
+def test_delete_matches_rebuild(load, write, assert_rebuilt):
+    anime = make_anime(load)
+    add_anime(anime, write)
+    write(
+        anime.delete,
+        [schema_anime.DeletedElement(id=3), schema_anime.DeletedElement(id=4)],
+    )
+    assert anime.series["Monogatari"] == {1, 2}
+    assert_rebuilt(anime, attrs=ANIME_STATE)
+
+    write(
+        anime.delete,
+        [schema_anime.DeletedElement(id=1), schema_anime.DeletedElement(id=2)],
+    )
+    assert "Monogatari" not in anime.series
+    assert_rebuilt(anime, attrs=ANIME_STATE)
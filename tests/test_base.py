@@ -0,0 +1,79 @@
+import pytest
+from crud.challenges import ChallengesData
+from crud.credits import CreditsData
+from crud.lore import LoreData
+from crud.marathons import MarathonsData
+from crud.merch import MerchData
+from schemas import challenges as schema_challenges
+from schemas import credits as schema_credits
+from schemas import lore as schema_lore
+from schemas import marathons as schema_marathons
+from schemas import merch as schema_merch
+
+DOMAINS = [
+    (
+        LoreData,
+        schema_lore,
+        [
+            {"text": "Первый", "block_id": "start"},
+            {"text": "Второй", "block_id": "start", "order": 1},
+            {"text": "Третий", "block_id": "end"},
+        ],
+        {"text": "Изменённый", "order": 2},
+    ),
+    (
+        ChallengesData,
+        schema_challenges,
+        [
+            {"name": "Без смертей", "status": "В процессе"},
+            {"name": "Спидран", "type": "stream"},
+            {"name": "Все концовки", "status": "Сделано"},
+        ],
+        {"name": "Все ачивки", "status": "Дропнуто"},
+    ),
+    (
+        MarathonsData,
+        schema_marathons,
+        [
+            {"name": "Souls"},
+            {"name": "Horror", "order": 1},
+            {"name": "Retro"},
+        ],
+        {"name": "Horror 2", "order": 3},
+    ),
+    (
+        CreditsData,
+        schema_credits,
+        [
+            {"name": "Дизайн", "order": 1},
+            {"name": "Код", "order": 1, "creators": [{"name": "mirakzen"}]},
+            {"name": "Идея", "order": 10},
+        ],
+        {"description": "Бэкенд", "order": 3},
+    ),
+    (
+        MerchData,
+        schema_merch,
+        [
+            {"name": "Футболка", "price": "1000"},
+            {"name": "Кружка", "order": 1},
+            {"name": "Стикеры", "status": "Продано"},
+        ],
+        {"price": "500", "order": 1},
+    ),
+]
+
+
+@pytest.mark.parametrize("domain_class, schema, new, updated", DOMAINS)
+def test_writes_match_rebuild(
+    load, write, assert_rebuilt, domain_class, schema, new, updated
+):
+    domain = load(domain_class)
+    write(domain.add, [schema.NewElement(**values) for values in new])
+    assert_rebuilt(domain)
+
+    write(domain.update, [schema.UpdatedElement(id=2, **updated)])
+    assert_rebuilt(domain)
+
+    write(domain.delete, [schema.DeletedElement(id=1)])
+    assert_rebuilt(domain)
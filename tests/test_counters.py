@@ -0,0 +1,89 @@
+import pytest
+from common import counters
+from common.counters import LocalCounters, RedisCounters
+from crud.twitchbot_counters import TwitchBotCounter
+from db.models import TwitchBotCounters
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+THROTTLED = "Cлишком быстрое изменение счётчика"
+
+
+@pytest.fixture
+def counter(run, write, monkeypatch):
+    monkeypatch.setattr(counters, "_counters", LocalCounters())
+    counter = TwitchBotCounter("death")
+    write(counter.setup)
+    yield counter
+    run(counter.stop())
+
+
+def test_delayed_update_is_throttled(run, write, counter):
+    write(counter.set, "boss", 0)
+    assert run(counter.update("boss", True)) == "1"
+    assert run(counter.update("boss", True)) == THROTTLED
+    assert run(counter.update("boss", False)) == "2"
+
+
+def test_plain_update_starts_delay(run, write, counter):
+    write(counter.set, "boss", 0)
+    assert run(counter.update("boss", False)) == "1"
+    assert run(counter.update("boss", True)) == THROTTLED
+    assert run(counter.get_value("boss", None)) == 1
+
+
+def test_redis_refresh_throttle(run):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCounters.__new__(RedisCounters)
+    backend.client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    assert run(backend.throttle("death", "boss", 30))
+    assert not run(backend.throttle("death", "boss", 30))
+    run(backend.refresh_throttle("death", "other", 30))
+    assert not run(backend.throttle("death", "other", 30))
+
+
+def saved_values(run, engine) -> dict[str, int]:
+    async def select_values() -> dict[str, int]:
+        async with AsyncSession(engine) as session:
+            rows = await session.scalars(select(TwitchBotCounters))
+            return {row.name: row.value for row in rows}
+
+    return run(select_values())
+
+
+def test_reset_drops_pending_increments(run, write, engine, counter):
+    write(counter.set, "boss", 5)
+    run(counter.update("boss", False))
+    write(counter.reset)
+    assert counter.pending == {} and counter.pending_updates == 0
+
+    write(counter.set, "boss", 0)
+    run(counter.flush())
+    assert saved_values(run, engine) == {"boss": 0}
+
+
+def test_shared_backend_flush_keeps_set_value(run, write, engine, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCounters.__new__(RedisCounters)
+    backend.client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(counters, "_counters", backend)
+    # two workers with one redis
+    first, second = TwitchBotCounter("death"), TwitchBotCounter("death")
+    write(first.setup)
+    write(first.set, "boss", 5)
+    write(second.setup)
+
+    assert run(second.update("boss", False)) == "6"
+    write(first.set, "boss", 0)
+    run(second.flush())
+    assert saved_values(run, engine) == {"boss": 0}
+    assert run(second.get_value("boss", None)) == 0
+
+    assert run(first.update("boss", False)) == "1"
+    assert run(second.update("boss", False)) == "2"
+    run(first.flush())
+    run(second.flush())
+    assert saved_values(run, engine) == {"boss": 2}
+    run(first.stop())
+    run(second.stop())
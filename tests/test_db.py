@@ -0,0 +1,23 @@
+from db.common import get_model_dict, insert_rows
+from db.models import Lore
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def test_insert_rows_with_different_keys(run, engine):
+    rows = [
+        {"text": "first", "block_id": "a", "order": 1},
+        {"id": 10, "text": "second", "block_id": "a", "order": 2},
+        {"text": "third", "block_id": "b", "order": 1},
+    ]
+
+    async def insert() -> tuple[list[int], dict]:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            async with session.begin():
+                ids = await insert_rows(session, Lore, rows)
+            saved = await session.scalars(select(Lore))
+            return ids, {row.id: get_model_dict(row) for row in saved}
+
+    ids, saved = run(insert())
+    assert ids[1] == 10
+    assert [saved[item_id]["text"] for item_id in ids] == ["first", "second", "third"]
@@ -0,0 +1,36 @@
+import pytest
+from api.answers import CachedAnswer
+from crud.credits import CreditsData
+from crud.lore import LoreData
+from crud.merch import MerchData
+from schemas import credits as schema_credits
+from schemas import lore as schema_lore
+from schemas import merch as schema_merch
+from starlette.requests import Request
+
+DOMAINS = [
+    (CreditsData, schema_credits.NewElement(name="Код", order=1)),
+    (MerchData, schema_merch.NewElement(name="Кружка")),
+    (LoreData, schema_lore.NewElement(text="Начало", block_id="start")),
+]
+
+
+def request(if_none_match: str = "") -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize("domain_class, element", DOMAINS)
+def test_workers_agree_on_etag_after_add(load, write, domain_class, element):
+    # worker that made the change and worker that loaded it afterwards
+    changed = load(domain_class)
+    write(changed.add, [element])
+    loaded = load(domain_class)
+    assert changed.etag == loaded.etag
+
+    first = CachedAnswer(request(), changed.etag, changed.get_payload())
+    assert first.status_code == 200
+    second = CachedAnswer(
+        request(first.headers["etag"]), loaded.etag, loaded.get_payload()
+    )
+    assert second.status_code == 304
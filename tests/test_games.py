@@ -0,0 +1,178 @@
+import asyncio
+
+from crud.games import GamesData
+from schemas import games as schema_games
+
+
+async def no_steam(game_id: int) -> dict:
+    return {}
+
+
+def make_games(load) -> GamesData:
+    games = load(GamesData)
+    games.check_steam = no_steam
+    return games
+
+
+GAMES_STATE = ("lists", "keys", "fragments", "genres", "genre_counts", "search_index")
+
+
+def new_game(name: str, **values) -> schema_games.NewElement:
+    return schema_games.NewElement(
+        name=name, genre=values.pop("genre", "RPG"), **values
+    )
+
+
+def test_add_matches_rebuild(load, write, assert_rebuilt):
+    games = make_games(load)
+    write(
+        games.add,
+        [
+            new_game("Dark Souls", id=570),
+            new_game("Ведьмак", subname="Дикая Охота", genre="Экшен"),
+            new_game("Alan Wake", type="stream", genre="Хоррор"),
+            new_game("alan wake", type="stream", genre="Хоррор"),
+        ],
+    )
+    assert_rebuilt(games, attrs=GAMES_STATE)
+    assert [game["name"] for game in games.lists["stream"]] == [
+        "Alan Wake",
+        "alan wake",
+    ]
+
+
+def test_update_matches_rebuild(load, write, assert_rebuilt):
+    games = make_games(load)
+    write(
+        games.add,
+        [
+            new_game("Dark Souls", id=570),
+            new_game("Celeste", genre="Платформер"),
+            new_game("Alan Wake", type="stream", genre="Хоррор"),
+        ],
+    )
+    celeste_id = next(
+        game_id for game_id, game in games.data.items() if game["name"] == "Celeste"
+    )
+    alan_wake_id = next(
+        game_id for game_id, game in games.data.items() if game["name"] == "Alan Wake"
+    )
+
+    write(
+        games.update,
+        [
+            schema_games.UpdatedElement(id=570, name="Zelda", new_id=571),
+            schema_games.UpdatedElement(id=celeste_id, type="stream", genre="RPG"),
+            # last game of type moves away, type disappears
+            schema_games.UpdatedElement(id=alan_wake_id, type="old"),
+        ],
+    )
+    assert 570 not in games.data and 571 in games.data
+    assert "stream" in games.lists
+    assert_rebuilt(games, attrs=GAMES_STATE)
+
+    write(games.update, [schema_games.UpdatedElement(id=571, new_id=-1)])
+    assert 571 not in games.data
+    assert_rebuilt(games, attrs=GAMES_STATE)
+
+    write(
+        games.update_genres,
+        [schema_games.UpdatedGenre(name="RPG", new_name="Ролевая")],
+    )
+    assert_rebuilt(games, attrs=GAMES_STATE)
+
+
+def test_delete_matches_rebuild(load, write, assert_rebuilt):
+    games = make_games(load)
+    write(
+        games.add,
+        [
+            new_game("Dark Souls", id=570),
+            new_game("Celeste", id=504230, genre="Платформер"),
+            new_game("Alan Wake", id=108710, type="stream", genre="Хоррор"),
+        ],
+    )
+    write(
+        games.delete,
+        [
+            schema_games.DeletedElement(id=504230),
+            schema_games.DeletedElement(id=108710),
+        ],
+    )
+    assert "stream" not in games.lists
+    assert_rebuilt(games, attrs=GAMES_STATE)
+
+
+def test_search(load, write):
+    games = make_games(load)
+    write(
+        games.add,
+        [
+            new_game("Ёлки", gift_by="Vasya + Petya"),
+            new_game("Dark Souls", status="Пройдено", type="stream"),
+            new_game("Super Mario", genre="Платформер", order_by="Petya"),
+        ],
+    )
+
+    def search(query: str, **tags) -> list[str]:
+        found = games.search(query, tags, ["name"], 50)
+        return [game["name"] for game in found["items"]]
+
+    assert search("елки") == ["Ёлки"]
+    assert search("ouls") == ["Dark Souls"]
+    assert search("", genre="rpg") == ["Dark Souls", "Ёлки"]
+    assert search("", gift_by="petya") == ["Ёлки"]
+    assert search("s", type="stream", status="пройдено") == ["Dark Souls"]
+
+
+def test_setup_requeues_missing_info(load, write, run, assert_rebuilt):
+    games = make_games(load)
+    write(games.add, [new_game("Dark Souls", id=570), new_game("Celeste")])
+
+    # enrich queue was lost with restart, empty fields are found on load
+    restarted = load(GamesData)
+    del restarted.enrich_later
+    fetched = []
+
+    async def steam(game_id: int) -> dict:
+        fetched.append(game_id)
+        return {"link": f"https://store.steampowered.com/app/{game_id}", "picture": "p"}
+
+    restarted.check_steam = steam
+
+    async def requeue() -> None:
+        restarted.enrich_missing()
+        await restarted.enrich_task
+
+    run(requeue())
+    # non steam games are never fetched
+    assert fetched == [570]
+    assert load(GamesData).data[570]["picture"] == "p"
+    assert_rebuilt(restarted, attrs=GAMES_STATE)
+
+
+def test_stop_cancels_enrich(load, write, run):
+    games = make_games(load)
+    write(games.add, [new_game("Dark Souls", id=570)])
+    del games.enrich_later
+    cancelled = []
+    started = asyncio.Event()
+
+    async def steam(game_id: int) -> dict:
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(game_id)
+            raise
+
+    games.check_steam = steam
+
+    async def stop() -> None:
+        games.enrich_missing()
+        await started.wait()
+        await games.stop()
+
+    run(stop())
+    assert cancelled == [570]
+    assert games.enrich_task == None
@@ -0,0 +1,53 @@
+import pytest
+from crud.marathons import MarathonsData
+from schemas import marathons as schema_marathons
+
+
+def add_marathons(marathons: MarathonsData, write) -> None:
+    # 1 and 2 are marathons, 3-5 are games of marathon 1
+    write(
+        marathons.add,
+        [
+            schema_marathons.NewElement(name="Souls"),
+            schema_marathons.NewElement(name="Horror"),
+        ],
+    )
+    write(
+        marathons.add,
+        [
+            schema_marathons.NewElement(name=name, marathon_id=1)
+            for name in ("Demon's Souls", "Dark Souls", "Dark Souls II")
+        ],
+    )
+
+
+def test_add_and_update_keep_orders(load, write, assert_rebuilt):
+    marathons = load(MarathonsData)
+    add_marathons(marathons, write)
+    write(
+        marathons.update,
+        [
+            schema_marathons.UpdatedElement(id=5, order=1),
+            schema_marathons.UpdatedElement(id=2, order=1),
+            # moved game goes to the end of the other marathon
+            schema_marathons.UpdatedElement(id=4, marathon_id=2),
+        ],
+    )
+    assert marathons.data[5]["order"] == 1
+    assert marathons.data[3]["order"] == 2
+    assert marathons.data[4]["order"] == 1
+    assert marathons.data[2]["order"] == 1
+    assert_rebuilt(marathons)
+
+
+@pytest.mark.parametrize("ids", [[3, 1], [1, 3]])
+def test_delete_child_with_parent(load, write, ids, assert_rebuilt):
+    marathons = load(MarathonsData)
+    add_marathons(marathons, write)
+    write(
+        marathons.delete,
+        [schema_marathons.DeletedElement(id=item_id) for item_id in ids],
+    )
+    assert set(marathons.data) == {2}
+    assert marathons.data[2]["order"] == 1
+    assert_rebuilt(marathons)
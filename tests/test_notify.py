@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from db import notify
+
+
+async def handler(message: dict | None) -> None:
+    pass
+
+
+def test_sqlite_worker_is_leader(engine):
+    assert notify.is_leader()
+
+
+def test_postgres_worker_waits_for_advisory_lock(monkeypatch):
+    postgres = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    monkeypatch.setattr(notify, "get_engine", lambda: postgres)
+    # outbox starts in all_data.setup, before listener
+    assert not notify.is_leader()
+
+    listener = notify.Listener(handler)
+    monkeypatch.setattr(notify, "_listener", listener)
+    assert not notify.is_leader()
+    listener.leader = True
+    assert notify.is_leader()
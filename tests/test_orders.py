@@ -0,0 +1,56 @@
+from crud._orders import (
+    changed_group_orders,
+    group_orders,
+    insert_order,
+    move_order,
+    remove_order,
+)
+
+
+def numbered(orders: dict) -> list:
+    return sorted(orders, key=orders.get)
+
+
+def test_orders_stay_continuous():
+    orders = {}
+    for key in "abc":
+        insert_order(orders, key, None)
+    assert numbered(orders) == ["a", "b", "c"]
+
+    insert_order(orders, "d", 2)
+    assert numbered(orders) == ["a", "d", "b", "c"]
+    # out of range order goes to the end
+    insert_order(orders, "e", 10)
+    assert numbered(orders) == ["a", "d", "b", "c", "e"]
+
+    assert move_order(orders, "a", 4)
+    assert numbered(orders) == ["d", "b", "c", "a", "e"]
+    assert move_order(orders, "e", 1)
+    assert numbered(orders) == ["e", "d", "b", "c", "a"]
+    assert not move_order(orders, "e", 6)
+    assert not move_order(orders, "x", 1)
+
+    remove_order(orders, "d")
+    remove_order(orders, "x")
+    assert numbered(orders) == ["e", "b", "c", "a"]
+    assert sorted(orders.values()) == [1, 2, 3, 4]
+
+
+def test_group_orders_and_changes():
+    data = {
+        1: {"order": 1, "parent": None},
+        2: {"order": 2, "parent": None},
+        3: {"order": 1, "parent": 1},
+        4: {"order": None, "parent": 1},
+    }
+    groups = group_orders(data, "parent")
+    assert groups == {None: {1: 1, 2: 2}, 1: {3: 1}}
+
+    move_order(groups[None], 2, 1)
+    insert_order(groups[1], 4, 1)
+    assert changed_group_orders(groups, data) == [
+        {"id": 1, "order": 2},
+        {"id": 2, "order": 1},
+        {"id": 3, "order": 2},
+        {"id": 4, "order": 1},
+    ]
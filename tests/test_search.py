@@ -0,0 +1,133 @@
+from common.search import TextIndex, fold, stem
+from crud.games import GamesData
+from crud.lore import LoreData
+from db.models import Lore
+from schemas import games as schema_games
+from schemas import lore as schema_lore
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ITEMS = {
+    1: ("Dark Souls", [("genre", "RPG")]),
+    2: ("Dark Souls II", [("genre", "RPG"), ("status", "Пройдено")]),
+    3: ("Ёлки-палки", [("genre", "Комедия")]),
+    4: ("Darkest Dungeon", [("genre", "Рогалик")]),
+}
+
+
+def build(items: dict) -> TextIndex:
+    index = TextIndex()
+    for item_id, (text, tags) in items.items():
+        index.add(item_id, text, tags)
+    return index
+
+
+def test_fold():
+    assert fold("Ёлки-Палки!") == "елки палки"
+    assert fold(None) == ""
+
+
+def test_text_index_matches():
+    index = build(ITEMS)
+    assert index.match_text("dark") == {1, 2, 4}
+    assert index.match_text("dark so") == {1, 2}
+    assert index.match_text("елки") == {3}
+    assert index.match_text("ouls") == {1, 2}
+    assert index.match_text("!!!") == set()
+    assert index.match_tag("genre", "rpg") == {1, 2}
+    assert index.match_tag("status", "пройдено") == {2}
+
+
+def test_text_index_changes_match_rebuild():
+    index = build(ITEMS)
+    index.remove(2)
+    index.remove(4)
+    index.add(4, "Darkest Dungeon II", [("genre", "Рогалик")])
+    index.add(5, "Hades", [("genre", "Рогалик")])
+
+    items = {
+        1: ITEMS[1],
+        3: ITEMS[3],
+        4: ("Darkest Dungeon II", [("genre", "Рогалик")]),
+        5: ("Hades", [("genre", "Рогалик")]),
+    }
+    assert vars(index) == vars(build(items))
+    assert index.match_text("ii") == {4}
+
+
+def test_stem():
+    assert stem("игры") == stem("игра") == stem("играми") == "игр"
+    assert stem("souls") == "soul"
+    assert stem("кот") == "кот"
+
+
+def add_items(load, write) -> tuple[LoreData, GamesData]:
+    lore = load(LoreData)
+    games = load(GamesData)
+    write(
+        lore.add,
+        [
+            schema_lore.NewElement(
+                text="Стример прошёл все игры про ведьмаков", block_id="Игры"
+            ),
+            schema_lore.NewElement(text="Котики", block_id="Дом"),
+        ],
+    )
+    write(
+        games.add,
+        [
+            schema_games.NewElement(
+                id=1, name="Ведьмак", subname="Дикая Охота", genre="RPG"
+            ),
+            schema_games.NewElement(id=2, name="Dark Souls", genre="RPG"),
+        ],
+    )
+    return lore, games
+
+
+def test_site_search_ranks_typed_hits(load, write, site_search):
+    add_items(load, write)
+    hits = site_search.search("ведьмак", [], 20)
+    assert [(hit["type"], hit["title"]) for hit in hits] == [
+        ("games", "Ведьмак"),
+        ("lore", "Игры"),
+    ]
+    assert hits[0]["score"] > hits[1]["score"]
+    assert [hit["id"] for hit in site_search.search("dark sou", ["games"], 20)] == [2]
+    assert site_search.search("dark", ["lore"], 20) == []
+    assert site_search.search("", [], 20) == []
+
+
+def test_site_search_changes_match_rebuild(
+    load, write, run, engine, site_search, assert_rebuilt
+):
+    lore, games = add_items(load, write)
+    write(games.update, [schema_games.UpdatedElement(id=2, name="Dark Souls II")])
+    write(lore.update, [schema_lore.UpdatedElement(id=1, text="Совсем другой текст")])
+    write(games.delete, [schema_games.DeletedElement(id=1)])
+    assert_rebuilt(lore, games)
+    assert site_search.search("ведьмак", [], 20) == []
+
+    # change made by another worker comes with notification
+    async def change() -> None:
+        async with AsyncSession(engine) as session:
+            async with session.begin():
+                await session.execute(
+                    update(Lore).where(Lore.id == 2).values(text="Собаки")
+                )
+
+    run(change())
+    write(lore.reload, [2])
+    assert_rebuilt(lore, games)
+    assert [hit["id"] for hit in site_search.search("собаки", [], 20)] == [2]
+
+    # full reload, like after missed notifications
+    async def clear() -> None:
+        async with AsyncSession(engine) as session:
+            async with session.begin():
+                await session.execute(delete(Lore))
+
+    run(clear())
+    write(lore.reload, None)
+    assert site_search.search("собаки", [], 20) == []
+    assert_rebuilt(lore, games)
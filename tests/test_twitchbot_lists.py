@@ -0,0 +1,34 @@
+from crud.twitchbot_lists import TwitchBotList
+from schemas import twitchbot
+
+
+def new_elements(*values: str) -> list[twitchbot.NewElement]:
+    return [twitchbot.NewElement(value=value) for value in values]
+
+
+def test_add_rejects_exact_duplicates_only(write):
+    bite_places = TwitchBotList("bite_places")
+    write(bite_places.setup)
+    first = write(bite_places.add, new_elements("Ухо", "ухо"))
+    second = write(bite_places.add, new_elements("Ухо", " Ухо ", "Нос", "Нос"))
+    assert -1 not in first
+    assert second[0] == -1 and second[3] == -1
+    assert sorted(bite_places.data.values()) == sorted(["Ухо", "ухо", " Ухо ", "Нос"])
+
+    fresh = TwitchBotList("bite_places")
+    write(fresh.setup)
+    assert fresh.exact == bite_places.exact
+    assert fresh.normalized == bite_places.normalized
+
+
+def test_has_ignores_case_and_spaces(write):
+    ignore_list = TwitchBotList("bite_ignore_list")
+    write(ignore_list.setup)
+    write(ignore_list.add, new_elements("Nightbot", "nightbot"))
+    assert ignore_list.has(" NIGHTBOT")
+
+    ids = list(ignore_list.data)
+    write(ignore_list.delete, [twitchbot.DeletedElement(id=ids[0])])
+    assert ignore_list.has("nightbot")
+    write(ignore_list.delete, [twitchbot.DeletedElement(id=ids[1])])
+    assert not ignore_list.has("nightbot")